@@ -1,21 +1,54 @@
 # Author: Nathaniel Ruhl
 # This class assembles all the "tools" methods to analyze a horizon crossing
 
+import copy
+import warnings
 import numpy as np
 
 # import local libraries
 from Orbit import Orbit
-from xsects import BCM
-from gaussxw import gaussxwab
+from PlanetRegistry import FIELDS
+from LineOfSight import LineOfSight
+from xsects import BCM, ELEMENTS
+from gaussxw import gaussxw, gaussxwab
+from scipy.special import k1e
+import jit_kernels
 
 class AnalyzeCrossing(Orbit):
+    backend = "numpy"
+    profile = None   # density profile from DensityProfile.py, None for the exponential atmosphere of the Planet
 
-    def __init__(self, cb, H, E_kev=4.0):
+    # backend="jit" uses the compiled kernels in jit_kernels.py for tau_gauss() and exp_integral() when all of the parameters are single values. It falls back to "numpy" with a warning if numba is not installed
+    def __init__(self, cb, H, E_kev=4.0, backend="numpy"):
         Orbit.__init__(self, cb, H) # instansiates both Orbit and Planet classes
+        if backend not in ("numpy", "jit"):
+            raise RuntimeError("Invalid Argument: 'backend' must be 'numpy' or 'jit'")
+        if backend == "jit" and jit_kernels.HAVE_NUMBA is False:
+            warnings.warn("numba is not installed, using backend='numpy'")
+            backend = "numpy"
+        self.backend = backend
         self._E_kev = E_kev  # default energy, keV
         self._sigma = BCM.get_total_xsect(
             self.E_kev, self.mix_N, self.mix_O, self.mix_Ar, self.mix_C)  # default sigma
 
+    # Model of every orbit in an OrbitBatch (which needs an atmosphere) at once. Like with_params(), each planet and orbit quantity is an array of P values reshaped to (P, 1, 1), so transmittance_curve() returns a (P x T) family of curves.
+    # The times can be a single array for all of the orbits, or a (P x T) array such as batch.time_grid(T). E_kev is a single energy or one per orbit
+    @classmethod
+    def from_orbit_batch(cls, batch, E_kev=4.0):
+        if batch.atmosphere is None:
+            raise RuntimeError("The OrbitBatch needs an atmosphere, e.g. from OrbitBatch.from_planets()")
+        shape = (-1, 1, 1)
+        atmosphere = batch.atmosphere
+        # The model is made for the first orbit, then every planet and orbit quantity is replaced by the arrays of the batch
+        model = cls(cb=atmosphere.names[0], H=batch.H[0])
+        model.cb = "OrbitBatch"
+        columns = (batch.M, batch.R, atmosphere.g, atmosphere.rho0, atmosphere.scale_height, atmosphere.mix_N, atmosphere.mix_O, atmosphere.mix_Ar, atmosphere.mix_C)
+        model.set_planet({field: np.reshape(column, shape) for field, column in zip(FIELDS, columns)})
+        model.set_altitude(np.reshape(batch.H, shape))
+        model.E_kev = np.reshape(np.asarray(E_kev, dtype=float), shape) if np.ndim(E_kev) > 0 else E_kev
+        model.sigma = model.reset_sigma()
+        return model
+
     @property
     def E_kev(self):
         return self._E_kev
@@ -36,6 +69,34 @@ class AnalyzeCrossing(Orbit):
         return BCM.get_total_xsect(
             self.E_kev, self.mix_N, self.mix_O, self.mix_Ar, self.mix_C)
 
+    # Replaces the exponential atmosphere with a density profile (e.g. DensityProfile.TabulatedProfile), and sets rho0 to the density of the profile at z = 0. profile=None goes back to the exponential atmosphere with the surface density of the planet.
+    # All of the integrators, exp_integral(), and the rho0 retrieval work with any profile. tau_chapman(), kappa(), the scale height derivative of exp_integral(), and the scale height solvers only apply to the exponential atmosphere
+    def set_profile(self, profile):
+        self.profile = profile
+        if profile is not None:
+            self.rho0 = profile.rho0
+        else:
+            self.rho0 = self.reset_rho0()
+
+    def _check_exponential(self, name):
+        if self.profile is not None:
+            raise RuntimeError(f"{name} is only defined for the exponential atmosphere, not a density profile")
+
+    # True if any parameter is an array of P values, from with_params() or from_orbit_batch()
+    def _has_param_arrays(self):
+        return any(np.ndim(value) > 0 for value in (self.R, self.R_orbit, self.theta, self.omega, self.rho0, self.scale_height, self.sigma,
+                                                    self.mix_N, self.mix_O, self.mix_Ar, self.mix_C))
+
+    def _check_scalar(self, name):
+        if self._has_param_arrays():
+            raise RuntimeError(f"{name} does not support parameter arrays, use a model with single parameter values")
+
+    # The compiled kernels only take single values of the parameters and the exponential atmosphere, so parameter arrays (with_params() and from_orbit_batch()) and profiles always use numpy
+    def _use_jit(self):
+        if self.backend != "jit" or self.profile is not None:
+            return False
+        return not self._has_param_arrays()
+
     ## Define functions relevant to the 2d geometry below:
 
     # Tangent altitude (km) as a function of elevation angle (rad)
@@ -47,7 +108,7 @@ class AnalyzeCrossing(Orbit):
 
 
     def d_tot(self, t):
-        dtot = 2*np.sqrt(self.R_orbit**2 - (self.R+self.tan_alt(t))**2)
+        dtot = 2*self._los(t).half_chord
         return dtot
 
     # Relationship between elevation angle (rad) and angular velocity (rad/sec)
@@ -57,26 +118,45 @@ class AnalyzeCrossing(Orbit):
         epsilon = self.omega*t
         return epsilon
 
+    # Geometry of the line of sight at the time t (or array of times), computed once and passed to the functions below in place of t
+    def line_of_sight(self, t):
+        epsilon = self.elevation(t)
+        h = self.R_orbit*np.sin(self.theta+epsilon)-self.R
+        r2 = (self.R+h)**2
+        half_chord = np.sqrt(self.R_orbit**2 - r2)
+        return LineOfSight(t, epsilon, h, half_chord, r2)
+
+    # The functions below take either a time t or a LineOfSight
+    def _los(self, t):
+        if isinstance(t, LineOfSight):
+            return t
+        return self.line_of_sight(t)
+
     # Define functions to convert between a point at distance x on the line of sight and an altitude above Earth, z (km).
 
     def x_to_z(self, x_km, t):
-        z = np.sqrt((self.R+self.tan_alt(t))**2+((self.d_tot(t)/2)-x_km)**2)-self.R
+        los = self._los(t)
+        z = np.sqrt(los.r2+(los.half_chord-x_km)**2)-self.R
         return z
 
 
     def z_to_x(self, z_km, t):
-        x = (self.d_tot(t)/2) - np.sqrt((self.R+z_km)**2-(self.R+self.tan_alt(t))**2)
+        los = self._los(t)
+        x = los.half_chord - np.sqrt((self.R+z_km)**2-los.r2)
         return x
 
     # Evaluate the density at a single x distance on the LOS
 
     def rho_vs_x(self, x_km, t):
-        z_km = self.x_to_z(x_km, t)  # radial altitude above Earth
-        rho = self.rho_vs_z(z_km, t)   # g/cm^3, mass density
+        los = self._los(t)
+        z_km = self.x_to_z(x_km, los)  # radial altitude above Earth
+        rho = self.rho_vs_z(z_km, los)   # g/cm^3, mass density
         return rho
 
-    # Exponential density as a function of altitude (km)
+    # Exponential density as a function of altitude (km), or the density profile scaled to rho0 if one was set with set_profile()
     def rho_vs_z(self, z_km, t):
+        if self.profile is not None:
+            return self.rho0*self.profile.rho(z_km)/self.profile.rho0
         rho = self.rho0*np.exp(-z_km/self.scale_height)
         return rho
 
@@ -89,119 +169,409 @@ class AnalyzeCrossing(Orbit):
         gamma_array = gamma_array*10**5  # km^-1
         return gamma_array
 
-    # Recursive function that calculates the area under gamma from a to b, with midpoint c.
-    # gamma curve is defined for E_kev and t
-    def qstep(self, a, b, tol, t):
-        h1 = b - a
-        h2 = h1/2
-        c = (a+b)/2
-        d = (a+c)/2
-        e = (c+b)/2
-        # evaluate gamma at the desired points
-        ga = self.gamma_vs_x(a, t)
-        gb = self.gamma_vs_x(b, t)
-        gc = self.gamma_vs_x(c, t)
-        gd = self.gamma_vs_x(d, t)
-        ge = self.gamma_vs_x(e, t)
-
-        # Evaluate Integrals
-        I1 = (h1/6)*(ga + 4*gc + gb)
-        I2 = (h2/6)*(ga + 4*gd + 2*gc + 4*ge + gb)
-
-        # Euler-Mclaurin error
-        epsilon = (I2-I1)/15
-
-        if abs(epsilon) <= tol:
-            I = I2 + epsilon   # better estimate of the integral
-            return I, a, c, b
-        else:
-            # Cut b,the upper bound of the integral, in half
-            b = c
-            return self.qstep(a, b, tol, t)
-
-    # This is the main function that does the adaptive qudrature and returns the total optical depth
-    def tau_adaptive_simpson(self, t, tol):
+    # This is the main function that does the adaptive quadrature and returns the total optical depth
+    # Panels of the half LOS are refined with an explicit stack rather than recursion. Each panel carries gamma at its ends and midpoint, so refining it only evaluates gamma at its two quarter points, and no value is ever computed twice.
+    # A panel is accepted when the Euler-Mclaurin error of Simpson's rule is within tol. Returns tau, the half-widths and midpoints of the accepted panels, and the number of gamma evaluations if return_evals=True
+    def tau_adaptive_simpson(self, t, tol, return_evals=False):
         # Lists for step size and distance along the LOS
         dx_list = []
         x_midpoints = []
         tau_list = []   # keep track of tau along the LOS, will sum at the end
 
-        # First integral is over the entire domain
-        a_moving = 0.0  # will update this in the while loop
-        b_fixed = self.d_tot(t)/2
-
-        tau = 0
-        # Each iteration of the loop goes through one round of adaptive quadrature
-        while a_moving < b_fixed:
-            tau_i, x_lower, x_mid, x_upper = self.qstep(
-                a_moving, b_fixed, tol, t)
-            x_midpoints.append(x_mid)
-            dx_list.append(x_upper - x_mid)
-            tau_list.append(tau_i)
-            a_moving = x_upper   # Upper bound of last integral is lower bound of next integral
+        los = self.line_of_sight(t)
+        a = 0.0
+        b = los.half_chord
+        ga, gc, gb = self.gamma_vs_x(np.array([a, (a+b)/2, b]), los)
+        n_evals = 3
+
+        # The top of the stack is always the leftmost panel that has not been accepted yet
+        stack = [(a, b, ga, gc, gb)]
+        while stack:
+            a, b, ga, gc, gb = stack.pop()
+            h1 = b - a
+            h2 = h1/2
+            c = (a+b)/2
+            # evaluate gamma at the quarter points
+            gd, ge = self.gamma_vs_x(np.array([(a+c)/2, (c+b)/2]), los)
+            n_evals += 2
+
+            # Evaluate Integrals
+            I1 = (h1/6)*(ga + 4*gc + gb)
+            I2 = (h2/6)*(ga + 4*gd + 2*gc + 4*ge + gb)
+
+            # Euler-Mclaurin error
+            epsilon = (I2-I1)/15
+
+            # Also accept the panel if it can no longer be split in floating point
+            if abs(epsilon) <= tol or c == a or c == b:
+                tau_list.append(I2 + epsilon)   # better estimate of the integral
+                x_midpoints.append(c)
+                dx_list.append(b - c)
+            else:
+                # Split in half, reusing gamma at a, c, b and the quarter points
+                stack.append((c, b, gc, ge, gb))
+                stack.append((a, c, ga, gd, gc))
         tau = 2*sum(tau_list)
+        if return_evals is True:
+            return tau, dx_list, x_midpoints, n_evals
         return tau, dx_list, x_midpoints
 
-    # This function calculates optical depth for a line of sight at the time t with simpson's rule
+    # This function calculates optical depth for a line of sight at the time t (or array of times) with simpson's rule on exactly N slices, N must be even
     def tau_simpson(self, t, N):
-        dtot_km = self.d_tot(t)   # km, total length of the los
-
-        # Evaluate the integral over the LOS with Simpson's rule
-        # tau = sigma*dx_cm*np.sum(self.rho_vs_x(x_array_km[:-1], t)) is left-hand reimann sum
-        a = 0
-        b = dtot_km/2 
+        if N % 2 != 0:
+            raise RuntimeError("Simpson's rule requires an even number of slices, N")
+        los = self.line_of_sight(np.asarray(t, dtype=float)[..., np.newaxis])
+        a = 0.0
+        b = los.half_chord
         dx_km = (b-a)/N
-        x_array_km = np.arange(a, b+dx_km, dx_km)
+        x_array_km = a + dx_km*np.arange(N+1)
 
-        gamma_array = self.gamma_vs_x(x_array_km, t)
+        gamma_array = self.gamma_vs_x(x_array_km, los)
 
-        s_odd = 0
-        s_even = 0
-        for i in range(len(x_array_km)):
-            if i % 2 == 0:
-                s_even += gamma_array[i]
-            else:
-                s_odd += gamma_array[i]
-        tau = (dx_km/3)*(gamma_array[0] + gamma_array[-1] +
-                        4*s_odd + 2*s_even)   # value of integral
+        # Simpson weights 1, 4, 2, 4, ..., 2, 4, 1
+        weights = np.full(N+1, 2.0)
+        weights[1::2] = 4.0
+        weights[0] = weights[-1] = 1.0
+        tau = (dx_km[..., 0]/3)*np.sum(weights*gamma_array, axis=-1)   # value of integral
         return 2*tau
 
+    # This function calculates optical depth for a line of sight at the time t (or array of times) with Romberg integration. N = 2^k slices, and gamma is evaluated once on the finest grid and reused for the coarser trapezoid rules.
+    # Returns the Richardson-extrapolated optical depth and an error estimate, the difference from the extrapolation with N/2 slices
+    def tau_romberg(self, t, N):
+        if not isinstance(N, (int, np.integer)) or N < 2 or N & (N - 1) != 0:
+            raise RuntimeError("Romberg integration requires N to be a power of 2, at least 2")
+        k = int(N).bit_length() - 1   # N = 2^k
+        los = self.line_of_sight(np.asarray(t, dtype=float)[..., np.newaxis])
+        a = 0.0
+        b = los.half_chord
+        x_array_km = a + ((b-a)/N)*np.arange(N+1)
+        gamma_array = self.gamma_vs_x(x_array_km, los)
+        b = b[..., 0]
+
+        # Trapezoid rules with 1, 2, 4, ..., N slices from the nested grids
+        R_row = []
+        for j in range(k+1):
+            R_last = R_row   # previous row of the Romberg table
+            gamma_j = gamma_array[..., ::2**(k-j)]
+            R_row = [((b-a)/2**j)*(np.sum(gamma_j, axis=-1) - (gamma_j[..., 0] + gamma_j[..., -1])/2)]
+            # Richardson extrapolation
+            for m in range(1, j+1):
+                R_row.append(R_row[m-1] + (R_row[m-1] - R_last[m-1])/(4**m - 1))
+        tau = R_row[-1]
+        error = np.abs(R_row[-1] - R_last[-1])
+        return 2*tau, 2*error
+
     # This function calculates optical depth for a line of sight at the time t with gaussian quadrature
+    # t can be a single time or an array of times, in which case the (T x N) grid of gamma is evaluated in one broadcasted pass
     def tau_gauss(self, t, N):
+        if self._use_jit():
+            t = np.asarray(t, dtype=float)
+            x, w = gaussxw(N)
+            tau_array = jit_kernels.tau_gauss_kernel(np.ravel(t), x, w, self.R, self.R_orbit, self.theta, self.omega, self.rho0, self.scale_height, self.sigma)
+            return np.reshape(tau_array, t.shape)[()]   # [()] gives a numpy float for a single t, like the numpy backend
+        los = self.line_of_sight(np.asarray(t, dtype=float)[..., np.newaxis])   # trailing axis for the quadrature nodes
         a = 0.0
-        b = self.d_tot(t)/2
-        h = (b-a)/N
+        b = los.half_chord
         xlist, wlist = gaussxwab(N, a, b)
-        gamma_array = self.gamma_vs_x(xlist, t)   # Optical depth per km
+        gamma_array = self.gamma_vs_x(xlist, los)   # Optical depth per km
         # Integrate gamma vs x with gaussian quadrature
-        tau_gauss = np.sum(wlist*gamma_array)
+        tau_gauss = np.sum(wlist*gamma_array, axis=-1)
         return 2*tau_gauss
 
+    # Optical depth of the part of the line of sight at the time t that is within x_grid km (any shape, clipped to d_tot/2) of the tangent point, on both sides. Returns an array with the shape of x_grid. Only for a model with single parameter values, since the panels depend on the line of sight.
+    # The half LOS is split into n_panels equal panels, which are also split at every point of x_grid, and each panel is integrated with N point gaussian quadrature in a single pass. tau at every point of x_grid is then the cumulative sum of the panels out to it
+    def cumulative_tau(self, t, x_grid, N=10, n_panels=32):
+        self._check_scalar("cumulative_tau()")
+        los = self.line_of_sight(t)
+        b = los.half_chord
+        u_grid = np.clip(np.asarray(x_grid, dtype=float), 0.0, b)
+        edges = np.unique(np.concatenate([np.linspace(0.0, b, n_panels+1), np.ravel(u_grid)]))
+        ulist, wlist = gaussxwab(N, edges[:-1, np.newaxis], edges[1:, np.newaxis])   # (panels x N) distances from the tangent point
+        gamma_array = self.gamma_vs_x(b - ulist, los)
+        tau_edges = np.concatenate([[0.0], np.cumsum(np.sum(wlist*gamma_array, axis=-1), axis=-1)])
+        tau = 2*tau_edges[np.searchsorted(edges, u_grid)]
+        return tau
+
+    # Closed form optical depth for the exponential atmosphere, vectorized over t. Over an infinite chord the integral is 2*rho0*L*Ch(x)*exp(-h/L), where Ch(x) = x*exp(x)*K1(x) is the Chapman grazing-incidence function at x = (R+h)/L.
+    # The line of sight actually ends at the orbit, past which the column along each half is between exp(-H/L)*L and exp(-H/L)*L*R_orbit/(d_tot/2). The midpoint of that range is subtracted, and half its width is the truncation error bound (returned if return_bound=True)
+    def tau_chapman(self, t, return_bound=False):
+        self._check_exponential("tau_chapman()")
+        los = self.line_of_sight(np.asarray(t, dtype=float)[..., np.newaxis])   # same axes as the quadrature methods, for parameter arrays
+        h = los.tan_alt
+        x = (self.R + h)/self.scale_height
+        tau_inf = 2*self.sigma*self.rho0*self.scale_height*x*k1e(x)*np.exp(-h/self.scale_height)
+        # Truncation correction for the chord beyond the orbit on both sides
+        with np.errstate(divide="ignore"):
+            secant_max = self.R_orbit/los.half_chord
+        tail_scale = 2*self.sigma*self.rho0*self.scale_height*np.exp(-self.H/self.scale_height)
+        tail = np.minimum(tail_scale*(secant_max + 1)/2, tau_inf)
+        tau = (tau_inf - tail)[..., 0]*10**5   # km to cm
+        if return_bound is True:
+            bound = np.minimum(tail_scale*(secant_max - 1)/2, tau_inf)[..., 0]*10**5
+            return tau, bound
+        return tau
+
+    # Times (t_start, t_end) that bracket the transition of the crossing, outside of which the transmittance is within edge of 0 or 1. Found from the closed form tau_chapman() and its truncation bound on n_grid times, widened by one grid step on each side. Only for a model with single parameter values
+    # With a density profile, tau_gauss() with N = 10 is used on the grid instead
+    def transition_window(self, edge=1e-4, n_grid=1024):
+        self._check_scalar("transition_window()")
+        time_grid = np.linspace(0, self.time_final, n_grid)
+        if self.profile is None:
+            tau, bound = self.tau_chapman(time_grid, return_bound=True)
+        else:
+            tau, bound = self.tau_gauss(time_grid, 10), 0.0
+        opaque = np.where(tau - bound >= -np.log(edge))[0]   # transmittance < edge
+        transparent = np.where(tau + bound <= -np.log(1 - edge))[0]   # transmittance > 1 - edge
+        i_start = opaque[-1] if len(opaque) > 0 else 0
+        i_end = transparent[0] if len(transparent) > 0 else n_grid - 1
+        return time_grid[max(i_start - 1, 0)], time_grid[min(i_end + 1, n_grid - 1)]
+
+    # Samples the transmittance curve at non-uniform times, so that linear interpolation between them is accurate to tol everywhere in the crossing. Outside of transition_window(tol) the curve is within tol of 0 or 1, and only its ends are sampled.
+    # Inside, n_initial evenly spaced times are refined by bisection: each interval whose midpoint differs from the linear interpolation by more than tol is split, and all of the new midpoints of a pass are evaluated in one call to transmittance_curve(). Returns the times and transmittance. The refined times differ between crossings, so parameter arrays are not supported
+    def sample_crossing(self, tol=1e-4, method="gauss", N=10, n_initial=17, max_passes=30):
+        self._check_scalar("sample_crossing()")
+        t_start, t_end = self.transition_window(tol)
+        time_array = np.linspace(t_start, t_end, n_initial)
+        transmit_array = self.transmittance_curve(time_array, method, N)[1]
+        refine = np.ones(n_initial - 1, dtype=bool)   # intervals that still need to be checked
+        for i in range(max_passes):
+            if not np.any(refine):
+                break
+            left = np.where(refine)[0]
+            t_mid = (time_array[left] + time_array[left + 1])/2
+            transmit_mid = self.transmittance_curve(t_mid, method, N)[1]
+            error = np.abs(transmit_mid - (transmit_array[left] + transmit_array[left + 1])/2)
+            # Insert the midpoints, both halves of an interval are checked again if its error was too large
+            time_array = np.insert(time_array, left + 1, t_mid)
+            transmit_array = np.insert(transmit_array, left + 1, transmit_mid)
+            new_left = left + np.arange(len(left))   # index of the left half of each split interval
+            refine = np.zeros(len(time_array) - 1, dtype=bool)
+            refine[new_left] = error > tol
+            refine[new_left + 1] = error > tol
+        # End points of the crossing, where the curve is pinned at 0 or 1, if they are outside of the transition window
+        before = np.array([0.0]) if t_start > 0 else np.array([])
+        after = np.array([self.time_final]) if t_end < self.time_final else np.array([])
+        time_array = np.concatenate([before, time_array, after])
+        transmit_array = np.concatenate([self.transmittance_curve(before, method, N)[1], transmit_array, self.transmittance_curve(after, method, N)[1]])
+        return time_array, transmit_array
+
+    # This function calculates the optical depth and transmittance for an entire array of times in a horizon crossing
+    # method="gauss", "simpson", and "romberg" are vectorized over time, "adaptive" integrates one line of sight at a time
+    # Any of rho0, scale_height, sigma, E_kev, and H can be given as arrays of P values (see with_params()), in which case a (P x T) family of curves is returned
+    # If a ResultCache is given as cache, the curves are read from it when this configuration was computed before
+    def transmittance_curve(self, times, method="gauss", N=10, tol=1e-8, cache=None, **params):
+        if cache is not None:
+            return cache.cached(self, "transmittance_curve", lambda: self.transmittance_curve(times, method, N, tol, **params),
+                                times=times, method=method, N=N, tol=tol, **params)
+        if len(params) > 0:
+            if method == "adaptive":
+                raise RuntimeError("Parameter arrays are not supported with method='adaptive'")
+            return self.with_params(**params).transmittance_curve(times, method, N, tol)
+        time_array = np.asarray(times, dtype=float)
+        if method == "gauss":
+            tau_array = self.tau_gauss(time_array, N)
+        elif method == "simpson":
+            tau_array = self.tau_simpson(time_array, N)
+        elif method == "romberg":
+            tau_array, error_array = self.tau_romberg(time_array, N)
+        elif method == "adaptive":
+            tau_array = np.array([self.tau_adaptive_simpson(t, tol)[0] for t in time_array.ravel()])
+            tau_array = np.reshape(tau_array, time_array.shape)
+        else:
+            raise RuntimeError("Invalid Argument: 'method' must be 'gauss', 'simpson', 'romberg', or 'adaptive'")
+        transmit_array = np.exp(-tau_array)
+        return tau_array, transmit_array
+
+    # Times (sec) and tangent altitudes (km) at which the transmittance crosses each of the levels (e.g. [0.01, 0.5, 0.99]), with the shape of levels ((K,) for K levels), or always (P x K) for a model with parameter arrays (see with_params() and from_orbit_batch()). params are passed to with_params(), e.g. E_kev=energy_array.
+    # tau(t) decreases monotonically through the crossing, so each level is bracketed between two of n_grid evenly spaced times, then solved with the Illinois method (regula falsi) on ln(tau), for all levels and parameters at once. Levels that the crossing never reaches are nan
+    def crossing_times(self, levels, method="gauss", N=10, accuracy=1e-6, max_iter=50, n_grid=32, **params):
+        if len(params) > 0:
+            return self.with_params(**params).crossing_times(levels, method, N, accuracy, max_iter, n_grid)
+        log_tau_level = np.log(-np.log(np.atleast_1d(np.asarray(levels, dtype=float))))[np.newaxis, :]
+        time_grid = np.reshape(self.time_final, (-1, 1))*np.linspace(0, 1, n_grid)
+        tau_grid = self.transmittance_curve(time_grid, method, N)[0]
+        time_grid = np.broadcast_to(time_grid, tau_grid.shape)
+        # Index of the last grid time with tau >= the level
+        n_above = np.sum(tau_grid[:, :, np.newaxis] >= np.exp(log_tau_level)[:, np.newaxis, :], axis=1)
+        i_bracket = np.clip(n_above - 1, 0, n_grid - 2)
+        rows = np.arange(tau_grid.shape[0])[:, np.newaxis]
+
+        # ln(tau(t)) - ln(tau_level), where tau = 0 at the end of the crossing
+        def f(t):
+            with np.errstate(divide="ignore"):
+                return np.maximum(np.log(self.transmittance_curve(t, method, N)[0]), -700.0) - log_tau_level
+
+        a = time_grid[rows, i_bracket]
+        b = time_grid[rows, i_bracket + 1]
+        fa = f(a)
+        fb = f(b)
+        for i in range(max_iter):
+            active = np.abs(b - a) > accuracy
+            if not np.any(active):
+                break
+            c = np.where(active, b - fb*(b - a)/(fb - fa), b)
+            fc = f(c)
+            # Keep the end of the bracket with the opposite sign of fc, and halve its value if it is kept twice in a row
+            flip = active & (fc*fb < 0)
+            a, fa = np.where(flip, b, a), np.where(flip, fb, np.where(active, fa/2, fa))
+            b, fb = np.where(active, c, b), np.where(active, fc, fb)
+            done = active & (fc == 0)
+            a = np.where(done, c, a)
+        time_array = np.where((n_above > 0) & (n_above < n_grid), b, np.nan)
+        h_array = self.line_of_sight(time_array[..., np.newaxis]).tan_alt[..., 0]
+        if not self._has_param_arrays():
+            time_array = np.reshape(time_array, np.shape(levels))
+            h_array = np.reshape(h_array, np.shape(levels))
+        return time_array, h_array
+
+    # Returns a copy of this crossing in which each given parameter is an array of P values, reshaped to (P, 1, 1) so that it broadcasts against the time and quadrature node axes of the integrators. The original object is not modified.
+    # Arrays of different parameters are paired element by element (use np.meshgrid and ravel for a full grid). E_kev sets sigma from the BCM cross sections, so sigma and E_kev cannot both be given. Changing H changes the whole orbit, including time_final
+    def with_params(self, rho0=None, scale_height=None, sigma=None, E_kev=None, H=None):
+        if sigma is not None and E_kev is not None:
+            raise RuntimeError("sigma and E_kev cannot both be given, E_kev determines sigma")
+        if scale_height is not None:
+            self._check_exponential("The scale_height parameter")
+        model = copy.copy(self)
+        if rho0 is not None:
+            model.rho0 = np.reshape(np.asarray(rho0, dtype=float), (-1, 1, 1))
+        if scale_height is not None:
+            model.scale_height = np.reshape(np.asarray(scale_height, dtype=float), (-1, 1, 1))
+        if H is not None:
+            model.set_altitude(np.reshape(np.asarray(H, dtype=float), (-1, 1, 1)))
+        if E_kev is not None:
+            model.E_kev = np.reshape(np.asarray(E_kev, dtype=float), (-1, 1, 1))
+            model.sigma = model.reset_sigma()
+        if sigma is not None:
+            model.sigma = np.reshape(np.asarray(sigma, dtype=float), (-1, 1, 1))
+        return model
+
+    # Column density (g/cm^2) along the full line of sight at the time t (or array of times), integrated with gaussian quadrature. Optical depth at any energy is sigma*column_density
+    def column_density(self, t, N=10):
+        los = self.line_of_sight(np.asarray(t, dtype=float)[..., np.newaxis])
+        b = los.half_chord
+        xlist, wlist = gaussxwab(N, 0.0, b)
+        rho_array = self.rho_vs_x(xlist, los)   # g/cm^3
+        col_density = 2*np.sum(wlist*rho_array, axis=-1)*10**5   # km to cm
+        return col_density
+
+    # Column density (g/cm^2) of each element along the full line of sight at the time t (or array of times), stacked along a new first axis in the order of xsects.ELEMENTS (N, O, Ar, C).
+    # mixing is a dictionary with the volumetric mix of any of the elements, either a number or a function of altitude z (km) that works on arrays. Elements that are not in mixing use the mix of the planet. The density is evaluated once on the quadrature nodes for all of the elements
+    def species_columns(self, t, N=10, mixing=None):
+        los = self.line_of_sight(np.asarray(t, dtype=float)[..., np.newaxis])
+        b = los.half_chord
+        xlist, wlist = gaussxwab(N, 0.0, b)
+        z_array = self.x_to_z(xlist, los)
+        weighted_rho = wlist*self.rho_vs_z(z_array, los)
+        mix = {"N": self.mix_N, "O": self.mix_O, "Ar": self.mix_Ar, "C": self.mix_C}
+        if mixing is not None:
+            mix.update(mixing)
+        columns = []
+        for element in ELEMENTS:
+            mix_element = mix[element](z_array) if callable(mix[element]) else mix[element]
+            columns.append(2*np.sum(weighted_rho*mix_element, axis=-1)*10**5)   # km to cm
+        return np.stack(columns)
+
+    # Optical depth at every energy (keV) from the element columns of species_columns(), with shape (K,) + the time shape of columns (K = 1 for a single energy). This is a dot product with the BCM cross sections of the elements, so energy and composition scans don't repeat the quadrature.
+    # weights optionally multiplies the column of each element, e.g. an array of shape (4, P) for P compositions (from columns with a mix of 1 for every element), in which case the shape is (P, K) + the time shape
+    # xsect_table can be an xsects.XsectTable, for faster cross sections than the BCM formulas
+    @staticmethod
+    def tau_from_columns(columns, energies, weights=None, xsect_table=None):
+        energy_array = np.atleast_1d(np.asarray(energies, dtype=float))
+        if xsect_table is None:
+            xsects = BCM.element_xsects(energy_array)
+        else:
+            xsects = xsect_table.element_xsects(energy_array)
+        if weights is not None:
+            weights = np.asarray(weights, dtype=float)
+            xsects = weights[..., np.newaxis]*xsects.reshape((len(ELEMENTS),) + (1,)*(weights.ndim - 1) + (-1,))
+        return np.tensordot(xsects, columns, axes=(0, 0))
+
+    # Transmittance at every energy (keV) and time, with shape (K, T), or (P, K, T) for a model with parameter arrays (see with_params() and from_orbit_batch()), where each of the P crossings uses its own mix. With parameter arrays, the times can also be (P, T), such as batch.time_grid(T). The line of sight quadrature is done once for the column density, then tau(E, t) = sigma(E)*N_col(t).
+    # With a mixing dictionary (see species_columns()), such as altitude dependent mixing ratios, the quadrature is done once for the column of each element and tau is found with tau_from_columns()
+    # If out_file is given, the energies, times, and transmittance are also saved there with np.savez. If a ResultCache is given as cache, the cube is read from it when it was computed before
+    def spectral_cube(self, times, energies, N=10, out_file=None, cache=None, mixing=None):
+        if cache is not None and mixing is not None:
+            raise RuntimeError("spectral_cube() can't be cached with a mixing dictionary")
+        if cache is not None:
+            transmit_cube = cache.cached(self, "spectral_cube", lambda: self.spectral_cube(times, energies, N),
+                                         times=times, energies=energies, N=N)
+            if out_file is not None:
+                np.savez(out_file, energies=energies, times=times, transmit=transmit_cube)
+            return transmit_cube
+        time_array = np.asarray(times, dtype=float)
+        energy_array = np.asarray(energies, dtype=float)
+        if mixing is not None:
+            columns = self.species_columns(time_array, N, mixing)
+            transmit_cube = np.exp(-self.tau_from_columns(columns, energy_array))
+            if self._has_param_arrays():
+                transmit_cube = np.moveaxis(transmit_cube, 0, 1)   # (K, P, T) to (P, K, T)
+            if out_file is not None:
+                np.savez(out_file, energies=energy_array, times=time_array, transmit=transmit_cube)
+            return transmit_cube
+        col_density = self.column_density(time_array, N)
+        if self._has_param_arrays():
+            # The column density is (P, T) for times of shape (T,) or (P, T), and the mix can be a (P, 1, 1) array, so the energies go on the middle axis
+            sigma_array = BCM.get_total_xsect(np.reshape(energy_array, (1, -1, 1)), self.mix_N, self.mix_O, self.mix_Ar, self.mix_C)
+            transmit_cube = np.exp(-sigma_array*col_density[:, np.newaxis, :])
+        else:
+            sigma_array = BCM.get_total_xsect(energy_array, self.mix_N, self.mix_O, self.mix_Ar, self.mix_C)
+            transmit_cube = np.exp(-np.multiply.outer(sigma_array, col_density))
+        if out_file is not None:
+            np.savez(out_file, energies=energy_array, times=time_array, transmit=transmit_cube)
+        return transmit_cube
+
     # Methods below are used for the formulation in time
     def beta(self, t):
-        numerator = 2*self.R_orbit*self.omega*(self.R+self.tan_alt(t))
-        denominator = np.sqrt(self.R_orbit**2 - (self.R+self.tan_alt(t))**2)
+        los = self._los(t)
+        numerator = 2*self.R_orbit*self.omega*(self.R+los.tan_alt)
+        denominator = los.half_chord
         beta = numerator/denominator
         return beta
 
     def kappa(self, t):
-        kappa = self.sigma * self.rho0 * np.exp(-self.tan_alt(t)/self.scale_height) * self.beta(t)
+        self._check_exponential("kappa()")
+        los = self._los(t)
+        kappa = self.sigma * self.rho0 * np.exp(-los.tan_alt/self.scale_height) * self.beta(los)
         return kappa
 
     # This is the exponential integral that appears in Newton's method when solving rho0 or L, uses gaussian quadrature with N = 10 points. User input for scale height can over-ride the instance property
-    def exp_integral(self, t, scale_height=None):
+    # t can be an array of times, and scale_height a single value or an array that broadcasts against t
+    # If return_dL=True, the derivative with respect to scale height, the integral of exp(-z/L)*z/L^2, is also returned from the same quadrature nodes
+    # With a density profile, the integrand is the shape of the profile, rho(z)/rho0, so that tau = 2*sigma*rho0*exp_integral(t) still holds. scale_height and return_dL can't be used then
+    # If a ResultCache is given as cache, the result is read from it when it was computed before
+    def exp_integral(self, t, scale_height=None, return_dL=False, cache=None):
+        if cache is not None:
+            return cache.cached(self, "exp_integral", lambda: self.exp_integral(t, scale_height, return_dL),
+                                t=t, scale_height=scale_height, return_dL=str(return_dL))
+        if scale_height is not None or return_dL is True:
+            self._check_exponential("The scale height of exp_integral()")
         N = 10
+        if self._use_jit():
+            t, L = np.broadcast_arrays(np.asarray(t, dtype=float), np.asarray(self.scale_height if scale_height is None else scale_height, dtype=float))
+            x, w = gaussxw(N)
+            exp_int, dexp_int = jit_kernels.exp_integral_kernel(np.ravel(t), np.ravel(L), x, w, self.R, self.R_orbit, self.theta, self.omega)
+            if return_dL is True:
+                return np.reshape(exp_int, t.shape)[()], np.reshape(dexp_int, t.shape)[()]
+            return np.reshape(exp_int, t.shape)[()]
+        los = self.line_of_sight(np.asarray(t, dtype=float)[..., np.newaxis])
+        if scale_height is None:
+            scale_height = self.scale_height
+        else:
+            scale_height = np.asarray(scale_height, dtype=float)[..., np.newaxis]
         a = 0.0
-        b = self.d_tot(t)/2
-        h = (b-a)/N
+        b = los.half_chord
         xlist, wlist = gaussxwab(N, a, b)
-        if scale_height is None:
-            integrand_array = np.exp(-self.x_to_z(xlist, t)/self.scale_height)
+        z_array = self.x_to_z(xlist, los)
+        if self.profile is not None:
+            integrand_array = self.profile.rho(z_array)/self.profile.rho0
         else:
-            integrand_array = np.exp(-self.x_to_z(xlist, t)/scale_height)
+            integrand_array = np.exp(-z_array/scale_height)
         # Integrate with gaussian quadrature
-        exp_int = np.sum(wlist*integrand_array)
+        exp_int = np.sum(wlist*integrand_array, axis=-1)
         exp_int *= 10**5   # convert to cm
+        if return_dL is True:
+            dexp_int = np.sum(wlist*integrand_array*z_array/scale_height**2, axis=-1)*10**5
+            return exp_int, dexp_int
         return exp_int
 
 # Code to test the class
@@ -225,16 +595,16 @@ if __name__ == "__main__":
     plt.title(f"Transmission of {E_kev} keV X-rays")
     for SAT in sat_list:
         time_array = np.arange(0, SAT.time_final+1, 1)
-        transmit_array = np.zeros_like(time_array)
-        tan_alt_array = np.zeros_like(time_array)
-        for i, t in enumerate(time_array):
-            transmit_array[i] = np.exp(-SAT.tau_gauss(t, N=100))
-            tan_alt_array[i] = SAT.tan_alt(t)
+        tau_array, transmit_array = SAT.transmittance_curve(time_array, N=100)
+        tan_alt_array = SAT.tan_alt(time_array)
         hstar_array = tan_alt_array / SAT.scale_height
         print(SAT.cb)
         print(f"Period = {SAT.T} sec")
         print(f"tf = {SAT.time_final} sec")
         print(f"rho0 = {SAT.rho0}")
+        t50, h50 = SAT.crossing_times(0.5, N=100)
+        hstar50_list.append(h50/SAT.scale_height)
+        print(f"t50 = {t50} sec, h*50 = {hstar50_list[-1]}")
 
         plt.figure(1)
         plt.plot(tan_alt_array/SAT.scale_height, transmit_array, label=f"{SAT.cb} satellite at H={SAT.H} km")
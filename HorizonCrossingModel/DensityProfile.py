@@ -0,0 +1,62 @@
+# Author: Nathaniel Ruhl
+# Classes in this script define density profiles rho(z) of an atmosphere that can replace the single exponential of the Planet class, with AnalyzeCrossing.set_profile()
+
+# Any object with the methods of DensityProfile can be used as a profile. rho(z_km) must work on arrays of any shape (e.g. the (T x N) grid of quadrature nodes), and rho0 is the density at z = 0.
+# In AnalyzeCrossing the density is SAT.rho0*profile.rho(z)/profile.rho0, so the profile sets the shape of the atmosphere and the rho0 retrieval still scales it.
+
+import numpy as np
+from abc import ABC, abstractmethod
+
+# Subclasses must define rho() and parameters(), otherwise they can't be constructed
+class DensityProfile(ABC):
+    rho0 = None   # g/cm^3, density at z = 0
+
+    # Density (g/cm^3) at the altitudes z_km
+    @abstractmethod
+    def rho(self, z_km):
+        pass
+
+    # 1d array of numbers that defines the profile, used by ResultCache to tell profiles apart
+    @abstractmethod
+    def parameters(self):
+        pass
+
+# Density tabulated at the altitudes z_levels (km, increasing), any number of levels. ln(rho) is linear between the levels, so the atmosphere is exponential within each layer with the scale height -dz/d(ln rho).
+# Below the first and above the last level, the scale height of the nearest layer is used. The layer of each altitude is found with np.searchsorted
+class TabulatedProfile(DensityProfile):
+    def __init__(self, z_levels, rho_levels):
+        self.z_levels = np.asarray(z_levels, dtype=float)
+        self.log_rho_levels = np.log(np.asarray(rho_levels, dtype=float))
+        if self.z_levels.ndim != 1 or len(self.z_levels) < 2 or self.z_levels.shape != self.log_rho_levels.shape:
+            raise RuntimeError("z_levels and rho_levels must be 1d arrays of the same length, with at least 2 levels")
+        if np.any(np.diff(self.z_levels) <= 0):
+            raise RuntimeError("z_levels must be strictly increasing")
+        # ln(rho) = log_rho_levels[i] + slope[i]*(z - z_levels[i]) in layer i
+        self.slope = np.diff(self.log_rho_levels)/np.diff(self.z_levels)
+        self.rho0 = float(self.rho(0.0))
+
+    # Profile with the scale heights (km) of layers that start at z_bottoms (km, increasing), and the density rho_bottom at z_bottoms[0]. The density is continuous at the layer boundaries, and the last layer extends to z_top
+    @classmethod
+    def from_layers(cls, z_bottoms, rho_bottom, scale_heights, z_top):
+        z_levels = np.append(np.asarray(z_bottoms, dtype=float), z_top)
+        log_rho = np.log(rho_bottom) - np.concatenate([[0.0], np.cumsum(np.diff(z_levels)/np.asarray(scale_heights, dtype=float))])
+        return cls(z_levels, np.exp(log_rho))
+
+    def rho(self, z_km):
+        z_km = np.asarray(z_km, dtype=float)
+        layer = np.clip(np.searchsorted(self.z_levels, z_km, side="right") - 1, 0, len(self.slope) - 1)
+        return np.exp(self.log_rho_levels[layer] + self.slope[layer]*(z_km - self.z_levels[layer]))
+
+    # Local scale height (km) at the altitudes z_km
+    def scale_height(self, z_km):
+        layer = np.clip(np.searchsorted(self.z_levels, np.asarray(z_km, dtype=float), side="right") - 1, 0, len(self.slope) - 1)
+        return -1/self.slope[layer]
+
+    def parameters(self):
+        return np.concatenate([self.z_levels, self.log_rho_levels])
+
+if __name__ == '__main__':
+    profile = TabulatedProfile.from_layers([0, 11, 20, 50], 0.001225, [8.0, 6.3, 7.5, 8.5], 1000)
+    print(profile.rho0)
+    print(profile.rho(np.array([[0, 10], [100, 300]])))
+    print(profile.scale_height(np.array([5, 15, 30, 100])))
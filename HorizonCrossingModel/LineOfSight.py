@@ -0,0 +1,13 @@
+# Author: Nathaniel Ruhl
+# This class holds the geometry of the line of sight at a time t (or an array of times) in a horizon crossing, so that the trigonometry is only done once per line of sight. Instances are made with AnalyzeCrossing.line_of_sight(t)
+
+class LineOfSight:
+    __slots__ = ("t", "elevation", "tan_alt", "half_chord", "r2")
+
+    # t (sec), elevation (rad), tan_alt (km), half_chord (km) = d_tot/2 from the tangent point to the orbit, and r2 (km^2) = (R+tan_alt)^2. Each one is a single value or an array of the same shape as t
+    def __init__(self, t, elevation, tan_alt, half_chord, r2):
+        self.t = t
+        self.elevation = elevation
+        self.tan_alt = tan_alt
+        self.half_chord = half_chord
+        self.r2 = r2
@@ -10,6 +10,10 @@ from Planet import Planet, G
 class Orbit(Planet):
     def __init__(self, cb, H):
         Planet.__init__(self, cb)
+        self.set_altitude(H)
+
+    # Sets the orbital altitude and all of the orbit quantities that depend on it. H can also be an array of altitudes
+    def set_altitude(self, H):
         self.H = H   # km, orbital altitude
         self.R_orbit = self.R + self.H   # km, orbital radius
         self.T = self.radius_to_period() # sec, orbital period
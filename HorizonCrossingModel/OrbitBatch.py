@@ -0,0 +1,72 @@
+# Author: Nathaniel Ruhl
+# This class describes many circular orbits at once, around any number of central bodies, with every orbit quantity of the Orbit class as an array with one value per orbit
+# AnalyzeCrossing.from_orbit_batch() turns a batch into a single model for the transmittance calculations, so that scans over (planet, H) pairs are done with array code instead of a loop over Orbit objects
+
+import numpy as np
+
+# import local modules
+from Orbit import Orbit
+from PlanetRegistry import PlanetTable
+
+class OrbitBatch:
+    # M (kg), R (km), and H (km) are broadcast together to a 1d array of P orbits. atmosphere is an optional PlanetTable with the atmosphere of the central body of each orbit (rho0, scale_height, and the mix), which is needed for the transmittance calculations
+    def __init__(self, M, R, H, atmosphere=None):
+        M, R, H = np.broadcast_arrays(np.asarray(M, dtype=float), np.asarray(R, dtype=float), np.asarray(H, dtype=float))
+        if atmosphere is not None and len(atmosphere) != H.size:
+            raise RuntimeError("atmosphere must have one planet for each orbit")
+        self.atmosphere = atmosphere
+        self.M = np.ravel(M)
+        self.R = np.ravel(R)
+        self.set_altitude(np.ravel(H))   # H, R_orbit, T, omega, and theta of each orbit
+
+    # The orbit quantities are calculated with the functions of the Orbit class, which work on arrays of orbits
+    set_altitude = Orbit.set_altitude
+    radius_to_period = Orbit.radius_to_period
+    epsilon_final = Orbit.epsilon_final
+    time_final = Orbit.time_final
+
+    # Orbits at every altitude in H around every planet in the PlanetTable planets (P = number of planets x number of altitudes, planets vary slowest)
+    # If pairs=True, H has one altitude per planet instead, and P = number of planets
+    @classmethod
+    def from_planets(cls, planets, H, pairs=False):
+        H = np.ravel(np.asarray(H, dtype=float))
+        if pairs is True:
+            if len(H) != len(planets):
+                raise RuntimeError("With pairs=True, H must have one altitude for each planet")
+            index = np.arange(len(planets))
+        else:
+            index = np.repeat(np.arange(len(planets)), len(H))
+            H = np.tile(H, len(planets))
+        atmosphere = PlanetTable([planets.names[i] for i in index], planets.M[index], planets.R[index], planets.g[index], planets.rho0[index],
+                                 planets.scale_height[index], planets.mix_N[index], planets.mix_O[index], planets.mix_Ar[index], planets.mix_C[index])
+        return cls(atmosphere.M, atmosphere.R, H, atmosphere)
+
+    def __len__(self):
+        return len(self.H)
+
+    # (P x n_times) array of times from 0 to time_final of each orbit
+    def time_grid(self, n_times):
+        return self.time_final[:, np.newaxis]*np.linspace(0, 1, n_times)
+
+if __name__ == '__main__':
+    from PlanetRegistry import PLANETS
+    batch = OrbitBatch.from_planets(PLANETS.table(), [400, 420, 600])
+    print(batch.atmosphere.names)
+    print(batch.time_final)
+
+    # Check that the transmittance of every orbit, on its own (P x T) time grid, agrees with a model of that orbit alone
+    from AnalyzeCrossing import AnalyzeCrossing
+    energies = [2.0, 4.0]
+    time_grid = batch.time_grid(30)
+    models = [AnalyzeCrossing.from_orbit_batch(batch), AnalyzeCrossing(cb="Earth", H=420).with_params(H=batch.H[:3])]
+    time_grids = [time_grid, time_grid[:3]]
+    for model, times in zip(models, time_grids):
+        for mixing in [None, {}]:
+            cube = model.spectral_cube(times, energies, mixing=mixing)
+            if cube.shape != (len(times), len(energies), times.shape[1]):
+                raise RuntimeError(f"spectral_cube() has shape {cube.shape} with (P x T) times")
+            for i in range(len(times)):
+                cb = batch.atmosphere.names[i] if model.cb == "OrbitBatch" else "Earth"
+                single = AnalyzeCrossing(cb=cb, H=batch.H[i]).spectral_cube(times[i], energies)
+                np.testing.assert_allclose(cube[i], single, rtol=1e-12, atol=1e-15)
+    print("spectral_cube() with (P x T) times agrees with the single orbit models")
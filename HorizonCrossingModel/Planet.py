@@ -4,26 +4,19 @@
 
 G = 6.6743*10**(-11)     # Nm^2/kg^2, Gravitational constant
 
-# For now the default central body "cb" is Earth, and others can be added in the future (read from a ephemeris file, etc...)
+# import local libraries
+from PlanetRegistry import PLANETS
+
+# The central body "cb" can be any planet in the registry, which is read from PlanetEphems/planets.json. More can be added with PLANETS.register()
 class Planet():
     def __init__(self, cb):
         self.cb = cb
-        # Import the Planet dictionary into the local namespace, then access with locals() later
-        if self.cb == "Earth":
-            from PlanetEphems.Earth import Earth
-        elif self.cb == "Mars":
-            from PlanetEphems.Mars import Mars
-        elif self.cb == "Venus":
-            from PlanetEphems.Venus import Venus
-        elif self.cb == "P1":
-            from PlanetEphems.P1 import P1
-        elif self.cb == "P2":
-            from PlanetEphems.P2 import P2
-        else:
-            raise RuntimeError("The Planet class is not defined for the user-input")
         # Default properties of the Planet's atmosphere defined below. Atmospheric mix and scalel height can be can be changed internally with property setter methods
-        self.planet = locals()[cb]
+        self.set_planet(PLANETS.get(cb))   # raises a RuntimeError if the planet is not defined
 
+    # Sets every property of the central body from a dictionary with the keys of PlanetRegistry.FIELDS. The values can also be arrays of P planets, as in AnalyzeCrossing.from_orbit_batch(). The orbit quantities are not updated, so set_altitude() of the Orbit class has to be called after
+    def set_planet(self, planet):
+        self.planet = planet
         self.M = self.planet["Mass"]
         self.R = self.planet["Radius"]
         self.g = self.planet["surface_gravity"]
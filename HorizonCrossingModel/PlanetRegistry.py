@@ -0,0 +1,124 @@
+# Author: Nathaniel Ruhl
+# This class is the registry of central bodies that the Planet class reads from. Planets are defined in a single table on disk, PlanetEphems/planets.json, and more bodies (e.g. a synthetic population) can be registered at run time
+
+# Each planet is a dictionary with the keys in FIELDS:
+#   Mass (kg), Radius (km, equatorial radius), surface_gravity (m/s^2), surface_density (g/cm^3), scale_height (km), and the volumetric mix of the atmosphere, mix_N, mix_O, mix_Ar, mix_C
+# The table is only read the first time a planet is requested, and each entry is only validated once.
+
+import os
+import json
+import numpy as np
+
+FIELDS = ("Mass", "Radius", "surface_gravity", "surface_density", "scale_height", "mix_N", "mix_O", "mix_Ar", "mix_C")
+
+DEFAULT_TABLE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "PlanetEphems", "planets.json")
+
+# Struct-of-arrays view of many planets for vectorized calculations: names is a list, and each field is an array with one value per planet
+class PlanetTable:
+    def __init__(self, names, M, R, g, rho0, scale_height, mix_N, mix_O, mix_Ar, mix_C):
+        self.names = list(names)
+        self.M = M
+        self.R = R
+        self.g = g
+        self.rho0 = rho0
+        self.scale_height = scale_height
+        self.mix_N = mix_N
+        self.mix_O = mix_O
+        self.mix_Ar = mix_Ar
+        self.mix_C = mix_C
+
+    def __len__(self):
+        return len(self.names)
+
+    # Index of each planet name in the table
+    def index(self, cb):
+        return self.names.index(cb)
+
+class PlanetRegistry:
+    def __init__(self, fname=DEFAULT_TABLE):
+        self.fname = fname
+        self._raw = None   # entries as read from the table or registered, before validation
+        self._parsed = {}   # validated entries
+        self._table = None   # PlanetTable of all registered planets, rebuilt after a registration
+
+    # Reads the table on disk the first time it is needed
+    def _load(self):
+        if self._raw is None:
+            if self.fname is None:
+                self._raw = {}
+            else:
+                with open(self.fname) as f:
+                    self._raw = json.load(f)
+        return self._raw
+
+    @staticmethod
+    def _parse(cb, entry):
+        missing = [field for field in FIELDS if field not in entry]
+        if len(missing) > 0:
+            raise RuntimeError(f"The definition of planet '{cb}' is missing {', '.join(missing)}")
+        planet = {field: float(entry[field]) for field in FIELDS}
+        if planet["Mass"] <= 0 or planet["Radius"] <= 0 or planet["scale_height"] <= 0:
+            raise RuntimeError(f"Mass, Radius, and scale_height of planet '{cb}' must be positive")
+        return planet
+
+    def names(self):
+        return list(self._load().keys())
+
+    def __contains__(self, cb):
+        return cb in self._load()
+
+    # Returns the dictionary that defines the planet cb. Raises a RuntimeError for an unknown planet
+    def get(self, cb):
+        if cb not in self._parsed:
+            raw = self._load()
+            if cb not in raw:
+                raise RuntimeError(f"The planet '{cb}' is not defined, known planets are {', '.join(raw.keys())}")
+            self._parsed[cb] = self._parse(cb, raw[cb])
+        return dict(self._parsed[cb])
+
+    # Registers a dictionary of planet definitions {cb: {field: value}}. A planet that is already defined is only replaced if overwrite=True
+    def register(self, planets, overwrite=False):
+        raw = self._load()
+        parsed = {cb: self._parse(cb, entry) for cb, entry in planets.items()}
+        if overwrite is False:
+            existing = [cb for cb in parsed if cb in raw]
+            if len(existing) > 0:
+                raise RuntimeError(f"Planets already defined: {', '.join(existing)}. Use overwrite=True to replace them")
+        raw.update(planets)
+        self._parsed.update(parsed)
+        self._table = None
+
+    # Registers many planets from arrays, e.g. a synthetic population. Each field of FIELDS is given as a keyword argument with one value per name (or a single value for all of them)
+    def register_arrays(self, names, overwrite=False, **fields):
+        names = list(names)
+        columns = {field: np.broadcast_to(np.asarray(fields[field], dtype=float), (len(names),)) for field in fields}
+        planets = {cb: {field: columns[field][i] for field in columns} for i, cb in enumerate(names)}
+        self.register(planets, overwrite)
+
+    # Writes all of the registered planets to a JSON table, that can be read with PlanetRegistry(fname)
+    def save(self, fname):
+        raw = self._load()
+        with open(fname, "w") as f:
+            json.dump({cb: {key: (float(value) if key in FIELDS else value) for key, value in entry.items()} for cb, entry in raw.items()}, f, indent=4)
+
+    # Returns a PlanetTable of the planets in names (all registered planets by default)
+    def table(self, names=None):
+        if names is None:
+            if self._table is None:
+                self._table = self._make_table(self.names())
+            return self._table
+        return self._make_table(names)
+
+    def _make_table(self, names):
+        planets = [self.get(cb) for cb in names]
+        columns = {field: np.array([planet[field] for planet in planets]) for field in FIELDS}
+        return PlanetTable(names, columns["Mass"], columns["Radius"], columns["surface_gravity"], columns["surface_density"],
+                           columns["scale_height"], columns["mix_N"], columns["mix_O"], columns["mix_Ar"], columns["mix_C"])
+
+# Registry that is used by the Planet class
+PLANETS = PlanetRegistry()
+
+if __name__ == '__main__':
+    print(PLANETS.names())
+    table = PLANETS.table()
+    print(table.names, table.R, table.scale_height)
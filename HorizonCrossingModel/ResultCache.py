@@ -0,0 +1,141 @@
+# Author: Nathaniel Ruhl
+# This class is an on-disk cache of curve-level results (transmittance curves, exp_integral arrays, spectral cubes), so that the same model curve is only computed once across scripts and sessions
+
+# Each result is stored as .npy files named by a sha256 hash of the full configuration: the planet and atmosphere parameters, the orbit, the energy and cross section, the name of the calculation, and its arguments (times, integrator, N, ...).
+# Any change to the configuration gives a new key, so a stale result is never returned. CACHE_VERSION is also part of the key, and should be incremented when the integrators change.
+# Cached arrays are loaded as read-only memory maps. Results that are computed on a miss (or with bypass) are also made read-only, so a result never depends on whether it was in the cache. When the cache is larger than max_bytes, the least recently used results are deleted.
+# If bypass=True, every result is computed and nothing is read from or written to disk.
+
+import os
+import glob
+import hashlib
+import numpy as np
+
+CACHE_VERSION = 1
+
+# Default location of the cache, can be changed with the environment variable HCNM_CACHE_DIR
+DEFAULT_CACHE_DIR = os.environ.get("HCNM_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "HCNM"))
+
+# Attributes of an AnalyzeCrossing object that define the model
+MODEL_ATTRIBUTES = ("cb", "M", "R", "mix_N", "mix_O", "mix_Ar", "mix_C", "rho0", "scale_height", "H", "E_kev", "sigma")
+
+class ResultCache:
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=512*1024**2, bypass=False):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.bypass = bypass
+        self.hits = 0
+        self.misses = 0
+        if self.bypass is False:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+    # Returns the hex key of the calculation 'kind' of the model SAT with the keyword arguments in config. Values can be strings, numbers, arrays, or None
+    def key(self, SAT, kind, **config):
+        h = hashlib.sha256()
+        h.update(f"version={CACHE_VERSION};kind={kind};".encode())
+        items = [("model." + name, getattr(SAT, name)) for name in MODEL_ATTRIBUTES]
+        profile = getattr(SAT, "profile", None)
+        items.append(("model.profile", None if profile is None else profile.parameters()))
+        items += sorted(config.items())
+        for name, value in items:
+            h.update(name.encode() + b"=")
+            if value is None or isinstance(value, str):
+                h.update(repr(value).encode())
+            else:
+                array = np.ascontiguousarray(value, dtype=float)
+                h.update(f"{array.shape}".encode())
+                h.update(array.tobytes())
+            h.update(b";")
+        return h.hexdigest()
+
+    # Paths of the .npy files of a key, a single array is saved as <key>.npy and a tuple of arrays as <key>_0.npy, <key>_1.npy, ...
+    def _paths(self, key):
+        single = os.path.join(self.cache_dir, f"{key}.npy")
+        if os.path.exists(single):
+            return [single]
+        paths = []
+        while os.path.exists(os.path.join(self.cache_dir, f"{key}_{len(paths)}.npy")):
+            paths.append(os.path.join(self.cache_dir, f"{key}_{len(paths)}.npy"))
+        return paths
+
+    # Returns the cached array (or tuple of arrays) of key, or None if it is not in the cache
+    def load(self, key):
+        paths = self._paths(key)
+        if len(paths) == 0:
+            return None
+        try:
+            arrays = [np.load(path, mmap_mode="r") for path in paths]
+            for path in paths:
+                os.utime(path)   # marks the result as recently used
+        except (OSError, ValueError):
+            return None   # evicted or written by another process in the mean time
+        if len(paths) == 1 and paths[0].endswith(f"{key}.npy"):
+            return arrays[0]
+        return tuple(arrays)
+
+    # Saves an array or tuple of arrays under key, then evicts the least recently used results if the cache is larger than max_bytes
+    def save(self, key, result):
+        if isinstance(result, tuple):
+            names = [f"{key}_{i}.npy" for i in range(len(result))]
+            arrays = result
+        else:
+            names = [f"{key}.npy"]
+            arrays = [result]
+        for name, array in zip(names, arrays):
+            path = os.path.join(self.cache_dir, name)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                np.save(f, np.asarray(array))
+            os.replace(tmp_path, path)   # atomic, so that other processes never load a partial file
+        self.evict()
+
+    # Deletes the least recently used results until the cache is no larger than max_bytes
+    def evict(self):
+        groups = {}
+        for path in glob.glob(os.path.join(self.cache_dir, "*.npy")):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            key = os.path.basename(path)[:64]
+            size, last_used, paths = groups.get(key, (0, 0.0, []))
+            groups[key] = (size + stat.st_size, max(last_used, stat.st_mtime), paths + [path])
+        total_bytes = sum(group[0] for group in groups.values())
+        for size, last_used, paths in sorted(groups.values(), key=lambda group: group[1]):
+            if total_bytes <= self.max_bytes:
+                break
+            for path in paths:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            total_bytes -= size
+        return total_bytes
+
+    # Returns the cached result of the calculation, or calls compute() and caches its result. The arrays are read-only either way
+    def cached(self, SAT, kind, compute, **config):
+        if self.bypass is True:
+            return self._read_only(compute())
+        key = self.key(SAT, kind, **config)
+        result = self.load(key)
+        if result is None:
+            self.misses += 1
+            result = self._read_only(compute())
+            self.save(key, result)
+        else:
+            self.hits += 1
+        return result
+
+    # Marks an array or tuple of arrays as read-only, like the memory maps returned by load()
+    @staticmethod
+    def _read_only(result):
+        arrays = result if isinstance(result, tuple) else (result,)
+        for array in arrays:
+            if isinstance(array, np.ndarray):
+                array.setflags(write=False)
+        return result
+
+    # Deletes every result in the cache
+    def clear(self):
+        for path in glob.glob(os.path.join(self.cache_dir, "*.npy")):
+            os.remove(path)
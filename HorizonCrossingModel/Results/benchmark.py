@@ -0,0 +1,241 @@
+# Author: Nathaniel Ruhl
+# This script is a repeatable benchmark of the integrators, cross sections, and solvers over a fixed matrix of scenarios (planet x H x E x N or tol). Results are written to a JSON file, and can be compared to a stored baseline to flag regressions
+
+# Usage, from the HorizonCrossingModel directory:
+#   python Results/benchmark.py run [--out benchmark.json] [--quick]
+#   python Results/benchmark.py compare baseline.json benchmark.json [--threshold 0.2]
+
+# Each case records the wall time (min and median of n_repeat runs, after n_warmup calls that are not timed), the number of points at which the density was evaluated, and its error against a reference:
+#   - integrators: max |T - T_ref| over the times with 0.01 < T_ref < 0.99, where T_ref is tau_gauss with N = N_REF
+#   - exp_integral: max relative difference from the exponential integral implied by T_ref over the same times
+#   - cross sections: max relative difference of XsectTable from BCM on an energy grid (0 for BCM itself)
+#   - retrievals: relative error of the retrieved parameter from noiseless T_ref data
+#   - crossing_times: max |t - t_ref| (sec) at the levels, where t_ref is found with N = N_REF
+# Wall times depend on the machine, so a baseline should be compared to results from the same machine. The evaluation counts and errors should not change unless the algorithms do
+
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import numpy as np
+
+# import local libraries, from the HorizonCrossingModel directory above this script so that it runs without PYTHONPATH
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from AnalyzeCrossing import AnalyzeCrossing
+from xsects import BCM, XsectTable, VALID_RANGE_KEV
+from retrieval import retrieve_rho0, retrieve_scale_height, fit_crossing
+
+BENCHMARK_VERSION = 1
+
+# Scenario matrix
+PLANETS = ("Earth", "Mars", "Venus")
+H_LIST = (420, 2000)   # km
+E_LIST = (1.0, 4.0)   # keV
+GAUSS_N = (5, 10, 20, 50)
+SIMPSON_N = (10, 50, 200)
+ADAPTIVE_TOL = (1e-4, 1e-6, 1e-8)
+CROSSING_N = (5, 10, 20)
+N_REF = 200   # gaussian quadrature reference
+N_TIMES = 256   # evenly spaced times from 0 to time_final
+COMP_RANGE = (0.01, 0.99)
+CROSSING_LEVELS = (0.01, 0.5, 0.99)
+N_ENERGIES = 1000   # energy grid of the cross section cases
+
+# Smaller matrix for a quick check
+QUICK = {"PLANETS": ("Earth",), "H_LIST": (420,), "E_LIST": (4.0,), "ADAPTIVE_TOL": (1e-6,)}
+
+# Counts the points at which the density is evaluated on SAT, every integrator (with the numpy backend) maps its nodes to altitudes with x_to_z()
+class EvalCounter:
+    def __init__(self, SAT):
+        self.SAT = SAT
+        self.n_evals = 0
+
+    def __enter__(self):
+        x_to_z = self.SAT.x_to_z
+
+        def counting_x_to_z(x_km, t):
+            z = x_to_z(x_km, t)
+            self.n_evals += np.size(z)
+            return z
+        self.SAT.x_to_z = counting_x_to_z   # shadows the method on this instance only
+        return self
+
+    def __exit__(self, *args):
+        del self.SAT.x_to_z
+        return False
+
+# Returns the min and median wall time (sec) of one call of func() over n_repeat runs, after n_warmup calls. Fast functions are called n_loops times per run, so that each run takes at least min_run_time (sec) and the timer resolution doesn't matter
+def time_func(func, n_warmup, n_repeat, min_run_time=0.02):
+    for i in range(n_warmup):
+        func()
+    n_loops = 1
+    while True:
+        start_time = time.perf_counter()
+        for i in range(n_loops):
+            func()
+        if time.perf_counter() - start_time >= min_run_time:
+            break
+        n_loops *= 2
+    run_times = []
+    for i in range(n_repeat):
+        start_time = time.perf_counter()
+        for j in range(n_loops):
+            func()
+        run_times.append((time.perf_counter() - start_time)/n_loops)
+    return min(run_times), float(np.median(run_times)), n_loops
+
+# Runs a single case. func() returns the result that error_func() compares to the reference, SAT is the model whose density evaluations are counted (or n_evals is given)
+def run_case(name, scenario, func, error_func, n_warmup, n_repeat, SAT=None, n_evals=None):
+    if SAT is not None:
+        with EvalCounter(SAT) as counter:
+            result = func()
+        n_evals = counter.n_evals
+    else:
+        result = func()
+    time_min, time_median, n_loops = time_func(func, n_warmup, n_repeat)
+    record = {"case": name, **scenario, "time_min": time_min, "time_median": time_median,
+              "n_repeat": n_repeat, "n_loops": n_loops, "n_evals": int(n_evals), "error": float(error_func(result))}
+    print(f"{case_key(record):<60} {time_min*1e3:>10.3f} ms {record['n_evals']:>10d} evals   error = {record['error']:.2e}")
+    return record
+
+# Unique key of a case, used to match the cases of two result files
+def case_key(record):
+    return "|".join(f"{field}={record[field]}" for field in ("case", "planet", "H", "E_kev", "N", "tol") if field in record)
+
+# Cases of the integrators, exp_integral, and solvers for one planet, H, and E
+def scenario_cases(cb, H, E_kev, n_warmup, n_repeat, matrix):
+    SAT = AnalyzeCrossing(cb=cb, H=H, E_kev=E_kev)
+    time_array = np.linspace(0, SAT.time_final, N_TIMES)
+    tau_ref, transmit_ref = SAT.transmittance_curve(time_array, method="gauss", N=N_REF)
+    in_range = (transmit_ref > COMP_RANGE[0]) & (transmit_ref < COMP_RANGE[1])
+    exp_int_ref = tau_ref/(2*SAT.sigma*SAT.rho0)
+    scenario = {"planet": cb, "H": H, "E_kev": E_kev}
+
+    def transmit_error(transmit):
+        return np.max(np.abs(transmit - transmit_ref)[in_range])
+
+    records = []
+    for N in GAUSS_N:
+        records.append(run_case("tau_gauss", {**scenario, "N": N}, lambda: np.exp(-SAT.tau_gauss(time_array, N)),
+                                transmit_error, n_warmup, n_repeat, SAT))
+    for N in SIMPSON_N:
+        records.append(run_case("tau_simpson", {**scenario, "N": N}, lambda: np.exp(-SAT.tau_simpson(time_array, N)),
+                                transmit_error, n_warmup, n_repeat, SAT))
+    for tol in matrix["ADAPTIVE_TOL"]:
+        records.append(run_case("tau_adaptive_simpson", {**scenario, "tol": tol},
+                                lambda: np.exp(-np.array([SAT.tau_adaptive_simpson(t, tol)[0] for t in time_array])),
+                                transmit_error, 0, n_repeat, SAT))
+    records.append(run_case("exp_integral", {**scenario, "N": 10}, lambda: SAT.exp_integral(time_array),
+                            lambda exp_int: np.max(np.abs(exp_int[in_range]/exp_int_ref[in_range] - 1)), n_warmup, n_repeat, SAT))
+
+    # Retrievals from noiseless reference data in the comparison range
+    times, transmit_data = time_array[in_range], transmit_ref[in_range]
+    records.append(run_case("retrieve_rho0", scenario, lambda: retrieve_rho0(SAT, times, transmit_data)[2],
+                            lambda rho0: abs(rho0/SAT.rho0 - 1), n_warmup, n_repeat, SAT))
+    records.append(run_case("retrieve_scale_height", scenario,
+                            lambda: retrieve_scale_height(SAT, times, transmit_data, 1.1*SAT.scale_height)[0],
+                            lambda L_array: np.max(np.abs(L_array/SAT.scale_height - 1)), n_warmup, n_repeat, SAT))
+    records.append(run_case("fit_crossing", scenario,
+                            lambda: fit_crossing(SAT, times, transmit_data, p0=(1.2*SAT.rho0, 0.9*SAT.scale_height))[0],
+                            lambda p_fit: np.max(np.abs(p_fit/np.array([SAT.rho0, SAT.scale_height]) - 1)), n_warmup, n_repeat, SAT))
+    t_ref = SAT.crossing_times(CROSSING_LEVELS, N=N_REF, accuracy=1e-9)[0]
+    for N in CROSSING_N:
+        records.append(run_case("crossing_times", {**scenario, "N": N}, lambda: SAT.crossing_times(CROSSING_LEVELS, N=N)[0],
+                                lambda t_levels: np.max(np.abs(t_levels - t_ref)), n_warmup, n_repeat, SAT))
+    return records
+
+# Cases of the cross sections, with the mix of each planet on an energy grid across the valid range
+def xsect_cases(cb, n_warmup, n_repeat):
+    SAT = AnalyzeCrossing(cb=cb, H=420)
+    energies = np.geomspace(VALID_RANGE_KEV[0], VALID_RANGE_KEV[1], N_ENERGIES)
+    mix = (SAT.mix_N, SAT.mix_O, SAT.mix_Ar, SAT.mix_C)
+    xsect_ref = BCM.get_total_xsect(energies, *mix)
+    table = XsectTable()
+    scenario = {"planet": cb}
+    error = lambda xsect: np.max(np.abs(xsect/xsect_ref - 1))
+    return [run_case("BCM.get_total_xsect", scenario, lambda: BCM.get_total_xsect(energies, *mix), error, n_warmup, n_repeat, n_evals=N_ENERGIES),
+            run_case("XsectTable.get_total_xsect", {**scenario, "N": table.n_points}, lambda: table.get_total_xsect(energies, *mix),
+                     error, n_warmup, n_repeat, n_evals=N_ENERGIES)]
+
+# Runs every case of the matrix and writes the results to out_file
+def run(out_file, n_warmup=2, n_repeat=5, quick=False):
+    matrix = {"PLANETS": PLANETS, "H_LIST": H_LIST, "E_LIST": E_LIST, "ADAPTIVE_TOL": ADAPTIVE_TOL}
+    if quick is True:
+        matrix.update(QUICK)
+    records = []
+    for cb in matrix["PLANETS"]:
+        records += xsect_cases(cb, n_warmup, n_repeat)
+        for H in matrix["H_LIST"]:
+            for E_kev in matrix["E_LIST"]:
+                records += scenario_cases(cb, H, E_kev, n_warmup, n_repeat, matrix)
+    results = {"version": BENCHMARK_VERSION,
+               "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+               "machine": {"platform": platform.platform(), "processor": platform.processor(),
+                           "python": platform.python_version(), "numpy": np.__version__},
+               "n_warmup": n_warmup, "N_REF": N_REF, "N_TIMES": N_TIMES,
+               "results": records}
+    with open(out_file, "w") as f:
+        json.dump(results, f, indent=1)
+    print(f"Wrote {len(records)} cases to {out_file}")
+    return results
+
+# Compares the results in current_file to baseline_file. A case regressed if both its min and median wall time grew by more than the fraction threshold, if it needs more density evaluations, or if its error grew by more than a factor of (1 + threshold) (errors below error_floor are treated as equal).
+# Returns the list of regressions, as (key, description) tuples
+def compare(baseline_file, current_file, threshold=0.2, error_floor=1e-12):
+    with open(baseline_file) as f:
+        baseline = {case_key(record): record for record in json.load(f)["results"]}
+    with open(current_file) as f:
+        current = {case_key(record): record for record in json.load(f)["results"]}
+
+    regressions = []
+    print(f"{'case':<60} {'time ratio':>10} {'evals':>16} {'error':>20}")
+    for key, record in current.items():
+        if key not in baseline:
+            print(f"{key:<60} new case")
+            continue
+        base = baseline[key]
+        # Both the min and median must be slower, so that a single run slowed by another process is not flagged
+        time_ratio = min(record["time_min"]/base["time_min"], record["time_median"]/base["time_median"])
+        flags = []
+        if time_ratio > 1 + threshold:
+            flags.append(f"time x{time_ratio:.2f}")
+        if record["n_evals"] > base["n_evals"]:
+            flags.append(f"evals {base['n_evals']} -> {record['n_evals']}")
+        if max(record["error"], error_floor) > (1 + threshold)*max(base["error"], error_floor):
+            flags.append(f"error {base['error']:.2e} -> {record['error']:.2e}")
+        print(f"{key:<60} {time_ratio:>10.2f} {base['n_evals']:>7d} -> {record['n_evals']:<7d} {base['error']:>9.2e} -> {record['error']:<9.2e} {'REGRESSION' if flags else ''}")
+        if flags:
+            regressions.append((key, ", ".join(flags)))
+    for key in baseline:
+        if key not in current:
+            print(f"{key:<60} missing from {current_file}")
+
+    print(f"\n{len(regressions)} regressions (threshold = {threshold:.0%})")
+    for key, description in regressions:
+        print(f"  {key}: {description}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark of the horizon crossing model")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    run_parser = subparsers.add_parser("run", help="run the benchmark and write the results to JSON")
+    run_parser.add_argument("--out", default="benchmark.json")
+    run_parser.add_argument("--warmup", type=int, default=2)
+    run_parser.add_argument("--repeat", type=int, default=5)
+    run_parser.add_argument("--quick", action="store_true", help="only Earth at H = 420 km and E = 4 keV")
+    compare_parser = subparsers.add_parser("compare", help="flag regressions against a baseline")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.2, help="allowed fractional increase in time and error")
+    args = parser.parse_args()
+
+    if args.command == "run":
+        run(args.out, args.warmup, args.repeat, args.quick)
+        return 0
+    regressions = compare(args.baseline, args.current, args.threshold)
+    return 1 if len(regressions) > 0 else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,48 @@
+# Author: Nathaniel Ruhl
+# This script compares the closed form Chapman optical depth to gaussian quadrature with N = 100, along with the truncation error bound returned by tau_chapman()
+
+import numpy as np
+import time
+import matplotlib.pyplot as plt
+
+from AnalyzeCrossing import AnalyzeCrossing
+
+def main():
+    sat_list = [AnalyzeCrossing(cb="Earth", H=420), AnalyzeCrossing(cb="Mars", H=420), AnalyzeCrossing(cb="Venus", H=420)]
+
+    for SAT in sat_list:
+        time_array = np.arange(0, SAT.time_final, 1)
+
+        start_time = time.time()
+        tau_chapman, bound = SAT.tau_chapman(time_array, return_bound=True)
+        run_time_chapman = time.time() - start_time
+
+        start_time = time.time()
+        tau_gauss = SAT.tau_gauss(time_array, N=100)
+        run_time_gauss = time.time() - start_time
+
+        # Compare where the transmittance is in the range that is used by the solvers
+        transmit_gauss = np.exp(-tau_gauss)
+        comp_range = np.where((transmit_gauss > 0.01) & (transmit_gauss < 0.99))[0]
+        abs_error = np.abs(tau_chapman - tau_gauss)
+        print(SAT.cb)
+        print(f"max |tau_chapman - tau_gauss(N=100)| = {np.max(abs_error[comp_range]):.3e}")
+        print(f"max truncation error bound = {np.max(bound[comp_range]):.3e}")
+        print(f"max fractional difference = {np.max(abs_error[comp_range]/tau_gauss[comp_range]):.3e}")
+        print(f"run time: chapman = {run_time_chapman:.2e} sec, gauss = {run_time_gauss:.2e} sec")
+
+        plt.figure(1)
+        plt.plot(time_array[comp_range], abs_error[comp_range], label=f"{SAT.cb}, difference")
+        plt.plot(time_array[comp_range], bound[comp_range], "--", label=f"{SAT.cb}, bound")
+
+    plt.figure(1)
+    plt.title("Chapman optical depth compared to Gaussian Quadrature with N = 100")
+    plt.xlabel(r"Time since $t_0$ (seconds)")
+    plt.ylabel("Optical depth difference")
+    plt.yscale("log")
+    plt.legend()
+    plt.show()
+    return 0
+
+if __name__ == '__main__':
+    main()
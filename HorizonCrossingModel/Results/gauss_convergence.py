@@ -16,13 +16,10 @@ time_array = np.arange(0, ES.time_final+1, 1)
 # Calculates a transmittance curve with N steps via gaussian quadrature, and returns the transmittance array and run-time
 def calculate_transmit_gauss(N):
 
-    transmit_gauss = np.zeros_like(time_array)
-
     # Time the full horizon crossing (over 300 evaluations of the integral)
     start_time = time.time()
 
-    for i, t in enumerate(time_array):
-        transmit_gauss[i] = np.exp(-ES.tau_gauss(t, N))
+    tau_gauss, transmit_gauss = ES.transmittance_curve(time_array, method="gauss", N=N)
     run_time = time.time() - start_time
 
     return transmit_gauss, run_time
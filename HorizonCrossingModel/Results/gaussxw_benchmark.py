@@ -0,0 +1,65 @@
+# Author: Nathaniel Ruhl
+# This script times the cached Gauss-Legendre points and weights against recomputing them on every call (as gaussxw did before the cache) on the workloads of the other Results scripts
+
+import numpy as np
+import time
+
+# import local libraries
+from AnalyzeCrossing import AnalyzeCrossing
+import gaussxw
+
+SAT = AnalyzeCrossing(cb="Earth", H=420, E_kev=4.0)
+
+# Times func() with a fresh cache or with the cache populated by a warmup call. Returns the best of n_repeat in seconds
+def time_workload(func, warm, n_repeat=5):
+    run_times = []
+    for i in range(n_repeat):
+        gaussxw.gaussxw_clear_cache()
+        if warm is True:
+            func()
+        start_time = time.perf_counter()
+        func()
+        run_times.append(time.perf_counter() - start_time)
+    return min(run_times)
+
+# Rebuilds the points and weights on every call, as gaussxw did before the cache
+def uncached_gaussxwab(N, a, b):
+    x, w = gaussxw._gaussxw_newton(N)
+    return 0.5*(b-a)*x+0.5*(b+a), 0.5*(b-a)*w
+
+# Workload of percent_contribution.contribution_vs_time(): 100 N=500 rules per line of sight at 8 times
+def percent_contribution_workload(gaussxwab):
+    for t in np.arange(50, 65, 2):
+        b = SAT.d_tot(t)/2
+        for x1 in np.linspace(b/2, b, 100):
+            xlist, wlist = gaussxwab(500, x1, b)
+            tau1 = 2*np.sum(wlist*SAT.gamma_vs_x(xlist, t))
+    return 0
+
+# Workload of gauss_convergence.py: one scalar tau_gauss per time step for N = 6 to 12
+def gauss_convergence_workload(gaussxwab):
+    time_array = np.arange(0, SAT.time_final+1, 1)
+    for N in range(6, 13):
+        for t in time_array:
+            b = SAT.d_tot(t)/2
+            xlist, wlist = gaussxwab(N, 0.0, b)
+            tau = 2*np.sum(wlist*SAT.gamma_vs_x(xlist, t))
+    return 0
+
+def main():
+    print("Workload                       uncached (s)   cached (s)   speedup")
+    for name, workload in [("percent_contribution", percent_contribution_workload), ("gauss_convergence", gauss_convergence_workload)]:
+        t_uncached = time_workload(lambda: workload(uncached_gaussxwab), warm=False, n_repeat=1)
+        t_cached = time_workload(lambda: workload(gaussxw.gaussxwab), warm=True)
+        print(f"{name:<30} {t_uncached:>12.4f} {t_cached:>12.4f} {t_uncached/t_cached:>9.1f}x")
+
+    # Cost of a single cold generation, recurrence-only vs the large-N path
+    print("\nN        recurrence (s)   large-N path (s)   speedup")
+    for N in [1000, 2000, 5000]:
+        t_newton = time_workload(lambda: gaussxw._gaussxw_newton(N), warm=False, n_repeat=3)
+        t_large = time_workload(lambda: gaussxw._gaussxw_large(N), warm=False, n_repeat=3)
+        print(f"{N:<8} {t_newton:>14.4f} {t_large:>18.4f} {t_newton/t_large:>9.1f}x")
+    return 0
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+# Author: Nathaniel Ruhl
+
+# This script fits rho0 and the scale height together to a simulated horizon crossing with a single least-squares fit over the whole curve
+
+import numpy as np
+import matplotlib.pyplot as plt
+
+from AnalyzeCrossing import AnalyzeCrossing
+from retrieval import fit_crossing
+
+STD = 0.05  # Standard deviation of the fractional noise added to the transmittance 'data'
+
+COMP_RANGE = [0.01, 0.9]  # range in which noise is added to the model and in which the parameters are fit
+
+def main():
+    SAT = AnalyzeCrossing(cb="Earth", H=420, E_kev=4.0)
+    time_array = np.arange(0, SAT.time_final + 1, 1, dtype=float)
+    tau_model, transmit_model = SAT.transmittance_curve(time_array, N=10)
+    fit_range = np.where((transmit_model > COMP_RANGE[0]) & (transmit_model < COMP_RANGE[1]))[0]
+
+    rng = np.random.default_rng()
+    transmit_data = transmit_model[fit_range]*rng.normal(1, STD, len(fit_range))
+
+    free = ("rho0", "scale_height")
+    p_fit, covariance, n_eval, converged = fit_crossing(SAT, time_array[fit_range], transmit_data, free=free,
+                                                        p0=(1.5*SAT.rho0, SAT.scale_height+1), std=STD)
+    p_err = np.sqrt(np.diag(covariance))
+    correlation = covariance[0, 1]/(p_err[0]*p_err[1])
+    print(f"rho0 = {p_fit[0]:.6f} +/- {p_err[0]:.6f} g/cm^3 (expected {SAT.rho0})")
+    print(f"scale height = {p_fit[1]:.4f} +/- {p_err[1]:.4f} km (expected {SAT.scale_height})")
+    print(f"correlation = {correlation:.3f}, {n_eval} model evaluations (converged: {converged})")
+
+    # Transmittance curve of the best fit
+    exp_int = SAT.exp_integral(time_array[fit_range], scale_height=p_fit[1])
+    transmit_fit = np.exp(-2*SAT.sigma*p_fit[0]*exp_int)
+
+    plt.figure()
+    plt.title("Joint fit of surface density and scale height")
+    plt.ylabel("Transmittance")
+    plt.xlabel("Time (s)")
+    plt.plot(time_array[fit_range], transmit_data, ".", label="Simulated data")
+    plt.plot(time_array[fit_range], transmit_fit, label="Best fit")
+    plt.legend()
+    plt.show()
+    return 0
+
+if __name__ == '__main__':
+    main()
@@ -16,10 +16,7 @@ def main():
     # km, tangent altitudes during the horizon crossing
     h_array = ISS.tan_alt(time_array)
     # Transmission at each time during the horizon crossing
-    transmit_array = np.zeros_like(time_array)
-
-    for i, t in enumerate(time_array):
-        transmit_array[i] = np.exp(-ISS.tau_gauss(t, N=10))
+    tau_array, transmit_array = ISS.transmittance_curve(time_array, N=10)
 
     plt.figure(1)
     # This is for an ISS-like orbit
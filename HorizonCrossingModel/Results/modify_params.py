@@ -7,27 +7,19 @@ import matplotlib.pyplot as plt
 
 from AnalyzeCrossing import AnalyzeCrossing
 
-# Function to calculate a transmittance array for a given SAT/orbital parameters
-def calc_transmit(SAT, time_array):
-    transmit_array = np.zeros_like(time_array)
-    for i, t in enumerate(time_array):
-        transmit_array[i] = np.exp(-SAT.tau_gauss(t, N=10))
-    return transmit_array
-
-# The functions below change parameters and make plots
+# The functions below change parameters and make plots. Each family of curves is calculated in a single call with the parameter given as an array
 
 def change_sigma():
     plt.figure()
     plt.title("Transmittance vs Time for Standard LEO")
     SAT = AnalyzeCrossing(cb="Earth", H=420, E_kev=4)
     time_array = np.arange(0, SAT.time_final + 1, 1, dtype=float)
-    alpha_list = [0.8, 0.9, 1.0, 1.1, 1.2]    # list of scaling factors for cross section
-    for alpha in alpha_list:
-        SAT.sigma = alpha*SAT.sigma
-        transmit_array = calc_transmit(SAT, time_array)
+    alpha_list = np.array([0.8, 0.9, 1.0, 1.1, 1.2])    # list of scaling factors for cross section
+    sigma_list = alpha_list*SAT.sigma
+    tau_curves, transmit_curves = SAT.transmittance_curve(time_array, N=10, sigma=sigma_list)
+    for alpha, sigma, transmit_array in zip(alpha_list, sigma_list, transmit_curves):
         plt.plot(time_array, transmit_array,
-                 label=f"alpha={alpha}, sigma = {SAT.sigma}")
-        SAT.sigma = SAT.reset_sigma()
+                 label=f"alpha={alpha}, sigma = {sigma}")
     plt.legend()
     return 0
 
@@ -37,13 +29,12 @@ def change_rho0():
     SAT = AnalyzeCrossing(cb="Earth", H=420, E_kev=4)
     time_array = np.arange(0, SAT.time_final + 1, 1, dtype=float)
     # list of scaling factors for rho0
-    alpha_list = [0.8, 0.9, 1.0, 1.1, 1.2]
-    for alpha in alpha_list:
-        SAT.rho0 = alpha*SAT.rho0
-        transmit_array = calc_transmit(SAT, time_array)
+    alpha_list = np.array([0.8, 0.9, 1.0, 1.1, 1.2])
+    rho0_list = alpha_list*SAT.rho0
+    tau_curves, transmit_curves = SAT.transmittance_curve(time_array, N=10, rho0=rho0_list)
+    for alpha, rho0, transmit_array in zip(alpha_list, rho0_list, transmit_curves):
         plt.plot(time_array, transmit_array,
-                 label=f"alpha={alpha}, rho0 = {SAT.rho0}")
-        SAT.rho0 = SAT.reset_rho0()
+                 label=f"alpha={alpha}, rho0 = {rho0}")
     plt.legend()
     return 0
 
@@ -56,13 +47,12 @@ def change_scale_height():
     SAT = AnalyzeCrossing(cb="Earth", H=420, E_kev=4)
     time_array = np.arange(0, SAT.time_final + 1, 1, dtype=float)
     # list of scaling factors for scale_height
-    alpha_list = [0.8, 0.9, 1.0, 1.1, 1.2]
-    for alpha in alpha_list:
-        SAT.scale_height = alpha*SAT.scale_height
-        transmit_array = calc_transmit(SAT, time_array)
+    alpha_list = np.array([0.8, 0.9, 1.0, 1.1, 1.2])
+    scale_height_list = alpha_list*SAT.scale_height
+    tau_curves, transmit_curves = SAT.transmittance_curve(time_array, N=10, scale_height=scale_height_list)
+    for alpha, scale_height, transmit_array in zip(alpha_list, scale_height_list, transmit_curves):
         plt.plot(time_array, transmit_array,
-                 label=fr"$\beta$={alpha}, scale_height = {SAT.scale_height:.2f} km")
-        SAT.scale_height = SAT.reset_scale_height()
+                 label=fr"$\beta$={alpha}, scale_height = {scale_height:.2f} km")
     plt.legend()
     return 0
 
@@ -3,8 +3,10 @@
 # This script uses Newton's method to solve for atmospheric scale height, L
 
 from AnalyzeCrossing import AnalyzeCrossing
+from ResultCache import ResultCache
+from ensemble import noisy_crossings
+from retrieval import retrieve_scale_height
 import numpy as np
-import random
 import matplotlib.pyplot as plt
 # plt.rc("text", usetex=True)  # uncover only for plots for paper
 
@@ -14,21 +16,13 @@ STD = 0.05  # Standard deviation of normal distribution from which noise is gene
 # range in which noise is added to the model and in which rho0 is solved
 COMP_RANGE = [0.01, 0.9]
 
-# This function generates noisy data for a horizon crossing
+# This function generates noisy data for a horizon crossing. If a ResultCache is given as cache, the model curve is read from it after the first run
 
 
-def generate_crossing(SAT, plot_bool):
+def generate_crossing(SAT, plot_bool, seed=None, cache=None):
     time_array = np.arange(0, SAT.time_final + 1, 1, dtype=float)
-    transmit_model = np.zeros_like(time_array)
-    transmit_data = np.zeros_like(time_array)
-    for i, t in enumerate(time_array):
-        transmit_model[i] = np.exp(-SAT.tau_gauss(t, N=10))
-
-    for i, t in enumerate(time_array):
-        if (transmit_model[i] > COMP_RANGE[0]) & (transmit_model[i] < COMP_RANGE[1]):
-            transmit_data[i] = transmit_model[i]*np.random.normal(1, STD)
-        else:
-            transmit_data[i] = transmit_model[i]
+    tau_model, transmit_model = SAT.transmittance_curve(time_array, N=10, cache=cache)
+    transmit_data = noisy_crossings(transmit_model, 1, np.random.default_rng(seed), STD, COMP_RANGE)[0]
     
     if plot_bool is True:
         plt.figure()
@@ -39,64 +33,20 @@ def generate_crossing(SAT, plot_bool):
 
     return transmit_data
 
-# This is the function used for Newton's method
+# Function to solve the scale height if cross section and rho0 are known
 
-def f(SAT, transmit_data_i, time_i, L_guess):
-    return np.log(transmit_data_i) + 2*SAT.sigma*SAT.rho0*SAT.exp_integral(time_i, scale_height=L_guess)
-
-# This function employs Newton's method to solve for the scale height (L) for which the transmission equation is valid, L_guess is the first guess for L. transmit_model_i is needed for chisq analysis
-# Returns the root, L, and chisq list track the iterations of Newton's method
-
-def find_root(SAT, transmit_data_i, time_i, L_guess, transmit_model_i):
-    L = L_guess
-    L_last = L_guess - 0.1
-    delta = 1.0
-    accuracy = 1e-4
-
-    L_error_list = []
-    chisq_list = []
-    while abs(delta) > accuracy:
-        L_error_list.append(abs(L - SAT.scale_height))
-        b = f(SAT, transmit_data_i, time_i, L)
-        m = (f(SAT, transmit_data_i, time_i, L) -
-             f(SAT, transmit_data_i, time_i, L_last))/(L-L_last)
-        delta = b/m
-        chisq = ((transmit_data_i-transmit_model_i)/STD)**2
-        chisq_list.append(chisq)
-        L_last = L
-        L -= delta
-    return L, np.array(L_error_list), np.array(chisq_list)
-
-# Function to solve rho0 if cross section and scale height are known
-
-
-def solve_L(SAT, transmit_data, L0_guess, crossing_plot_bool, chisq_plot_bool):
+def solve_L(SAT, transmit_data, L0_guess, crossing_plot_bool, cache=None):
     # Calculate tha model in order to specify the solution range
     time_array = np.arange(0, SAT.time_final + 1, 1, dtype=float)
-    transmit_model = np.zeros_like(time_array)
-    for i, t in enumerate(time_array):
-        transmit_model[i] = np.exp(-SAT.tau_gauss(t, N=10))
+    tau_model, transmit_model = SAT.transmittance_curve(time_array, N=10, cache=cache)
     # Index range in which to solve for rho0
     sol_range = np.where((transmit_model > COMP_RANGE[0]) & (
         transmit_model < COMP_RANGE[1]))[0]
 
-    # Use Newton's method to solve for scale height, L
-    L_list = []  # measured rho0 for each data point in the desired range
-    for indx in sol_range:
-        L, L_error_list, chisq_list = find_root(
-            SAT, transmit_data[indx], time_array[indx], L0_guess, transmit_model[indx])
-        L_list.append(L)
-        print(f"num iterations = {len(chisq_list)}")
-        if chisq_plot_bool is True:
-            # Plots to look more into the convergence of Newton's method
-            plt.figure()
-            plt.title("Iterations of Newton's Method")
-            plt.ylabel(r"$\chi^2$")
-            plt.xlabel(r"$|L_{{guess}}-L|$")
-            plt.plot(chisq_list, L_error_list, '.', label=fr"Transmittance = {transmit_model[indx]:.2f}")
-            plt.legend()
-
-    L_list = np.array(L_list)
+    # Use Newton's method to solve for scale height, L, at all of the data points in the range together
+    L_list, n_iter = retrieve_scale_height(
+        SAT, time_array[sol_range], transmit_data[sol_range], L0_guess)
+
     if crossing_plot_bool is True:
         plt.figure()
         plt.title(
@@ -104,7 +54,7 @@ def solve_L(SAT, transmit_data, L0_guess, crossing_plot_bool, chisq_plot_bool):
         plt.ylabel(r"Scale height (km)")
         plt.xlabel("Transmittance of Data Point")
         plt.plot(transmit_data[sol_range], L_list,
-                 label=fr'Mean $L$={np.mean(L_list):.4f} km')
+                 label=fr'Mean $L$={np.nanmean(L_list):.4f} km')
         plt.axhline(y=SAT.scale_height, xmin=0, xmax=1, linestyle='--',
                     color='r', label=fr"Expected $L=$ {SAT.scale_height} km")
         plt.legend()
@@ -117,16 +67,17 @@ def solve_L(SAT, transmit_data, L0_guess, crossing_plot_bool, chisq_plot_bool):
         plt.xlabel("Transmittance of Data Point")
         plt.ylabel(r"Fractional Error of scale height")
         plt.plot(transmit_data[sol_range], diff,
-                 label=fr"Mean Calculated $L=${np.mean(L_list):.4f} km")
+                 label=fr"Mean Calculated $L=${np.nanmean(L_list):.4f} km")
         plt.plot([], [], label=fr"Expected $L=${SAT.scale_height} km")
         plt.legend()
 
-    return np.mean(L_list)
+    return np.nanmean(L_list)
 
 def main():
     SAT = AnalyzeCrossing(cb="Earth", H=420, E_kev=4.0)
-    transmit_data = generate_crossing(SAT, plot_bool=True)
-    L_mean = solve_L(SAT, transmit_data, L0_guess=SAT.scale_height+1, crossing_plot_bool=True, chisq_plot_bool=False)
+    cache = ResultCache()  # the model curve is the same in every run, so it is read from the on-disk cache after the first one
+    transmit_data = generate_crossing(SAT, plot_bool=True, cache=cache)
+    L_mean = solve_L(SAT, transmit_data, L0_guess=SAT.scale_height+1, crossing_plot_bool=True, cache=cache)
     plt.show()
     return 0
 
@@ -5,36 +5,17 @@ import matplotlib.pyplot as plt
 
 # import local libraries
 from AnalyzeCrossing import AnalyzeCrossing
-from gaussxw import gaussxwab
 
 # Define the satellite to be used
 SAT = AnalyzeCrossing(cb="Earth", H=420, E_kev=4.0)
 
-# Calculates total optical depth along the LOS at time t. Called from the function that calculates percent contribution
-def calc_total_optical_depth(t):
-    dtot = SAT.d_tot(t)
-    N = 500
-    a = 0.0
-    b = dtot/2
-    h = (b-a)/N
-    xlist, wlist = gaussxwab(N, a, b)
-    gamma_array = SAT.gamma_vs_x(xlist, t)   # Optical depth per km
-    # Integrate gamma vs x with gaussian quadrature
-    tau_total = 2*np.sum(wlist*gamma_array)
-    return tau_total
-
-# Note that tau_total is calculated in the above function and used as an input to this to save computation time. "comp_string" determines if we're comparing optical depth or absorptio
-def calc_percent_contribution(t, x1, tau_total, comp_string):
-    dtot = SAT.d_tot(t)
-    N = 500
-    a = 0.0
-    b = dtot/2
-    h = (b-a)/N
-    # Calculate the area under the specified region of the curve
-    xlist, wlist = gaussxwab(N, x1, b)
-    gamma_region = SAT.gamma_vs_x(xlist, t)
-    # optical depth within the specified portion of the curve
-    tau1 = 2*np.sum(wlist*gamma_region)
+# Contribution of the part of the LOS within x_list km of the tangent point at time t, to either the total optical depth or the total absorption. All of the contributions come from a single call to cumulative_tau().
+# "comp_string" determines if we're comparing optical depth ("tau") or absorption ("absorption")
+def calc_percent_contribution(t, x_list, comp_string):
+    b = SAT.d_tot(t)/2
+    tau_cumulative = SAT.cumulative_tau(t, np.append(x_list, b))
+    tau1 = tau_cumulative[:-1]   # optical depth within each x of the tangent point
+    tau_total = tau_cumulative[-1]   # optical depth of the whole LOS
     if comp_string == "tau":
         contribution = tau1/tau_total
     elif comp_string == "absorption":
@@ -51,14 +32,10 @@ def contribution_vs_time(comp_string):
     time_list = np.arange(50, 65, 2)
     for ti in time_list:
         dtot_i = SAT.d_tot(ti)
-        x1_list_i = np.linspace(dtot_i/4, dtot_i/2, 100)
-        tau_total = calc_total_optical_depth(ti)  # used as an input to calc_percent_contribution()
-        contribution_list = []   # contribution list for a single time
-        for x1 in x1_list_i:
-            contribution_list.append(calc_percent_contribution(ti, x1, tau_total, comp_string))
-        # X axes for plots
-        xlist = (dtot_i/2)-x1_list_i
-        zlist = SAT.x_to_z(xlist, ti)
+        # X axes for plots, distance from the tangent point and altitude
+        xlist = np.linspace(0, dtot_i/4, 100)
+        zlist = SAT.x_to_z((dtot_i/2)-xlist, ti)
+        contribution_list = calc_percent_contribution(ti, xlist, comp_string)   # contribution list for a single time
         plt.figure(1)
         plt.plot(xlist, contribution_list, label=fr"t={ti} sec, h={SAT.tan_alt(ti):.2f}")
         plt.figure(2)
@@ -84,18 +61,12 @@ def contribution_vs_time(comp_string):
 def contribution_vs_scale_height(comp_string):
     t = 50
     dtot = SAT.d_tot(t)
-    x1_list = np.linspace(dtot/4, dtot/2, 100)
     # Lists for plot x axes
-    xlist = (dtot/2)-x1_list
-    zlist = SAT.x_to_z(x1_list, t)
+    xlist = np.linspace(0, dtot/4, 100)
+    zlist = SAT.x_to_z((dtot/2)-xlist, t)
     for scale_height in [6, 7, 8, 9]:
         SAT.scale_height = scale_height
-        # used as an input to calc_percent_contribution()
-        tau_total = calc_total_optical_depth(t)
-        contribution_list = []   # contribution list for a single time
-        for x1 in x1_list:
-            contribution_list.append(
-                calc_percent_contribution(t, x1, tau_total, comp_string))
+        contribution_list = calc_percent_contribution(t, xlist, comp_string)   # contribution list for a single time
         plt.figure(1)
         plt.plot(xlist, contribution_list,
                     label=fr"scale height = {SAT.scale_height} km")
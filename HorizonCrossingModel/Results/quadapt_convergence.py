@@ -33,13 +33,10 @@ def calculate_transmit_quadapt(tol):
 # Calculates a transmittance curve with N steps via gaussian quadrature, and returns the transmittance array and run-time
 def calculate_transmit_gauss(N):
 
-    transmit_gauss = np.zeros_like(time_array)
-
     # Time the full horizon crossing (over 300 evaluations of the integral)
     start_time = time.time()
 
-    for i, t in enumerate(time_array):
-        transmit_gauss[i] = np.exp(-ES.tau_gauss(t, N))
+    tau_gauss, transmit_gauss = ES.transmittance_curve(time_array, method="gauss", N=N)
     run_time = time.time() - start_time
 
     return transmit_gauss, run_time
@@ -74,7 +71,7 @@ def main():
     plt.figure(1)
     plt.title("Transmittance curves calculated with Adaptive Quadrature")
     plt.xlabel(r"Time since $t_0$ (seconds)")
-    plt.xlim([45, 80])
+    plt.xlim(ES.transition_window(edge=0.01))   # where 0.01 < transmittance < 0.99
     plt.ylabel("Transmittance")
     plt.legend()
 
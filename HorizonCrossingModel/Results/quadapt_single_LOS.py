@@ -15,9 +15,10 @@ tol_range = [1e-7, 1e-8]
 def main():
 
     for tol_i in tol_range:
-        tau, dx_list, x_midpoints = ES.tau_adaptive_simpson(t, tol_i)
-        
-        plt.plot(x_midpoints, dx_list, "-o", label=fr"tol={tol_i}")
+        tau, dx_list, x_midpoints, n_evals = ES.tau_adaptive_simpson(t, tol_i, return_evals=True)
+        print(f"tol={tol_i}: {n_evals} evaluations of gamma")
+
+        plt.plot(x_midpoints, dx_list, "-o", label=fr"tol={tol_i}, {n_evals} evaluations")
         plt.legend()
     plt.title("Step Sizes Identified in Adaptive Quadrature")
     plt.xlabel('$x$ (km) along the line of sight')
@@ -0,0 +1,114 @@
+# Author: Nathaniel Ruhl
+# This class retrieves rho0 and the scale height from transmittance samples one at a time as they arrive, so that the estimates are available during the horizon crossing instead of only after it
+
+# Each sample is (t, transmittance, std), where std is the fractional uncertainty of the transmittance. A sample is used if comp_range[0] < transmittance < comp_range[1], which only depends on the sample itself, so the model curve is never needed to pick the solution range.
+# For each sample that is used, rho0 is solved in closed form (as in retrieval.retrieve_rho0) with the scale height of SAT, and L is solved with Newton's method (as in retrieval.retrieve_scale_height) with the rho0 of SAT, starting from the current estimate of L. An L that did not converge within max_iter Newton iterations (its next Newton step is still above accuracy) is left out of the estimate of L and counted in n_unconverged.
+# The estimates are inverse-variance weighted means of the samples, which are updated with running sums, so the memory does not grow with the number of samples
+
+import numpy as np
+
+# import local libraries
+from retrieval import retrieve_rho0, retrieve_scale_height
+
+class StreamingRetriever:
+    def __init__(self, SAT, comp_range=(0.01, 0.9), L_guess=None, accuracy=1e-4, max_iter=50):
+        self.SAT = SAT
+        self.comp_range = comp_range
+        self.accuracy = accuracy
+        self.max_iter = max_iter
+        self.L_guess = SAT.scale_height if L_guess is None else L_guess
+        self.n_samples = 0   # number of samples received
+        self.n_used = 0   # number of samples in comp_range
+        self.n_unconverged = 0   # number of samples in comp_range where Newton's method did not converge for L
+        # Running sums of the weights and weighted values, as numpy floats so that the means are nan (not a ZeroDivisionError) before a sample is added
+        self._rho0_weights = np.float64(0.0)
+        self._rho0_sum = np.float64(0.0)
+        self._L_weights = np.float64(0.0)
+        self._L_sum = np.float64(0.0)
+
+    # Current estimates (t, rho0, rho0_err, L, L_err, n_used) after the sample at time t. Values are nan before any sample was used
+    def estimate(self, t=np.nan):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rho0_mean = self._rho0_sum/self._rho0_weights
+            rho0_err = 1/np.sqrt(self._rho0_weights)
+            L_mean = self._L_sum/self._L_weights
+            L_err = 1/np.sqrt(self._L_weights)
+        return float(t), float(rho0_mean), float(rho0_err), float(L_mean), float(L_err), self.n_used
+
+    # Adds the sample to the running estimates. Returns the new estimates, or None if the sample is outside of comp_range
+    def update(self, t, transmit, std=0.05):
+        self.n_samples += 1
+        if not (self.comp_range[0] < transmit < self.comp_range[1]):
+            return None
+        self.n_used += 1
+        times = np.array([t], dtype=float)
+        transmit_data = np.array([transmit], dtype=float)
+
+        rho0_array, rho0_err, rho0_mean, rho0_mean_err = retrieve_rho0(self.SAT, times, transmit_data, std)
+        self._rho0_weights += 1/rho0_err[0]**2
+        self._rho0_sum += rho0_array[0]/rho0_err[0]**2
+
+        L_start = self._L_sum/self._L_weights if self._L_weights > 0 else self.L_guess
+        L_array = retrieve_scale_height(self.SAT, times, transmit_data, L_start, self.accuracy, self.max_iter)[0]
+        if not np.isfinite(L_array[0]):
+            self.n_unconverged += 1
+            return self.estimate(t)
+        exp_int, dexp_int = self.SAT.exp_integral(times, scale_height=L_array, return_dL=True)
+        dtau_dL = 2*self.SAT.sigma*self.SAT.rho0*dexp_int[0]
+        # Newton step from the retrieved L, which is below accuracy only if the solver converged
+        step = (np.log(transmit) + 2*self.SAT.sigma*self.SAT.rho0*exp_int[0])/dtau_dL
+        if not (abs(step) <= self.accuracy):
+            self.n_unconverged += 1
+        else:
+            # Uncertainty of L from the uncertainty of ln(T), through d(tau)/dL
+            L_err = std/abs(dtau_dL)
+            self._L_weights += 1/L_err**2
+            self._L_sum += L_array[0]/L_err**2
+        return self.estimate(t)
+
+    # Generator of the updated estimates for an iterable of (t, transmittance, std) samples, such as a generator that reads them from an instrument. An estimate is yielded for each sample that is used
+    def stream(self, samples):
+        for t, transmit, std in samples:
+            estimate = self.update(t, transmit, std)
+            if estimate is not None:
+                yield estimate
+
+    # Asynchronous generator of the updated estimates for samples that are put on an asyncio.Queue. The stream ends when None is put on the queue
+    async def astream(self, queue):
+        while True:
+            sample = await queue.get()
+            if sample is None:
+                break
+            estimate = self.update(*sample)
+            if estimate is not None:
+                yield estimate
+
+if __name__ == '__main__':
+    import asyncio
+    from AnalyzeCrossing import AnalyzeCrossing
+    from ensemble import noisy_crossings
+
+    STD = 0.05
+    SAT = AnalyzeCrossing(cb="Earth", H=420, E_kev=4.0)
+    time_array = np.arange(0, SAT.time_final + 1, 1, dtype=float)
+    transmit_model = SAT.transmittance_curve(time_array, N=10)[1]
+    transmit_data = noisy_crossings(transmit_model, 1, np.random.default_rng(1), STD)[0]
+
+    # Samples from a generator
+    retriever = StreamingRetriever(SAT, L_guess=SAT.scale_height + 1)
+    for t, rho0, rho0_err, L, L_err, n_used in retriever.stream((t, T, STD) for t, T in zip(time_array, transmit_data)):
+        if n_used % 5 == 0:
+            print(f"t = {t:.0f} sec, {n_used} samples: rho0 = {rho0:.6f} +/- {rho0_err:.6f} g/cm^3, L = {L:.3f} +/- {L_err:.3f} km")
+
+    # The same samples from an asyncio queue, as they arrive
+    async def main():
+        queue = asyncio.Queue()
+        for sample in zip(time_array, transmit_data, np.full(len(time_array), STD)):
+            queue.put_nowait(sample)
+        queue.put_nowait(None)
+        async for estimate in StreamingRetriever(SAT, L_guess=SAT.scale_height + 1).astream(queue):
+            last = estimate
+        return last
+
+    print(f"asyncio queue: final estimate {asyncio.run(main())}")
+    print(f"expected rho0 = {SAT.rho0} g/cm^3, L = {SAT.scale_height} km")
@@ -0,0 +1,110 @@
+# Author: Nathaniel Ruhl
+# This class is a precomputed table of optical depth in dimensionless variables, which answers transmittance queries for any planet or orbit with an exponential atmosphere by interpolation instead of quadrature
+
+# In an exponential atmosphere, with distances in units of the scale height L, the optical depth of a line of sight is
+#   tau = 2*sigma*rho0*L * exp(-h*) * F,   F = int_0^U exp(-(sqrt(r^2 + u^2) - r)) du
+# where h* = h/L is the dimensionless tangent altitude, r = R/L + h* is the radius of the tangent point, and U = sqrt((R_orbit/L)^2 - r^2) ends the line of sight at the orbit.
+# So F only depends on (h*, R/L, R_orbit/R) through r and w = R_orbit/L - r, the distance from the tangent point up to the orbit. ln(F/U) is smooth in ln(r) and ln(w), and it is tabulated on a regular grid in those two variables with gaussian quadrature and interpolated linearly.
+# Below the table, F/U -> 1 as w -> 0, so ln(F/U) is clamped to its value at w_min. Above the table, the cut at the orbit changes F by less than exp(-w_max), so F is clamped to its value at w_max. Queries with r outside the table return nan.
+# The table measures its own error when it is built: max_rel_err is the largest relative error of F (and so of tau) at the centres of the grid cells, where linear interpolation is least accurate.
+
+import numpy as np
+from scipy.interpolate import RegularGridInterpolator
+
+# import local libraries
+from gaussxw import gaussxwab
+
+class TauTable:
+    def __init__(self, r, w, log_FU, max_rel_err):
+        self.r = r
+        self.w = w
+        self.log_FU = log_FU
+        self.max_rel_err = max_rel_err
+        self._interp = RegularGridInterpolator((np.log(r), np.log(w)), log_FU, bounds_error=False, fill_value=np.nan)
+
+    # Half length of the line of sight from the tangent point to the orbit, in scale heights
+    @staticmethod
+    def U(r, w):
+        return np.sqrt(2*r*w + w**2)
+
+    # Dimensionless column F(r, w) with gaussian quadrature on N points, broadcast over the inputs
+    @staticmethod
+    def F_quad(r, w, N=200):
+        r = np.asarray(r, dtype=float)[..., np.newaxis]
+        w = np.asarray(w, dtype=float)[..., np.newaxis]
+        U = TauTable.U(r, w)
+        ulist, wlist = gaussxwab(N, 0.0, U)
+        F = np.sum(wlist*np.exp(-(np.sqrt(r**2 + ulist**2) - r)), axis=-1)
+        return F
+
+    # Tabulates ln(F/U) on a grid that is logarithmic in both r and w
+    @classmethod
+    def build(cls, r_range=(50.0, 6000.0), n_r=65, w_range=(1e-6, 100.0), n_w=161, N=200):
+        r = np.geomspace(r_range[0], r_range[1], n_r)[:, np.newaxis]
+        w = np.geomspace(w_range[0], w_range[1], n_w)[np.newaxis, :]
+        log_FU = np.log(TauTable.F_quad(r, w, N=N)/TauTable.U(r, w))
+        table = cls(r[:, 0], w[0, :], log_FU, np.nan)
+
+        # Relative error at the cell centres
+        r_c = np.sqrt(r[:-1, :]*r[1:, :])
+        w_c = np.sqrt(w[:, :-1]*w[:, 1:])
+        F_exact = TauTable.F_quad(r_c, w_c, N=N)
+        F_interp = table.F_rw(r_c, w_c)
+        table.max_rel_err = np.max(np.abs(F_interp/F_exact - 1))
+        return table
+
+    # Saves the table as a compressed binary .npz file
+    def save(self, fname):
+        np.savez_compressed(fname, r=self.r, w=self.w, log_FU=self.log_FU, max_rel_err=self.max_rel_err)
+
+    @classmethod
+    def load(cls, fname):
+        data = np.load(fname)
+        return cls(data["r"], data["w"], data["log_FU"], float(data["max_rel_err"]))
+
+    # Interpolated F(r, w), which is 0 for tangent points at or above the orbit (w <= 0)
+    def F_rw(self, r, w):
+        r, w = np.broadcast_arrays(np.asarray(r, dtype=float), np.asarray(w, dtype=float))
+        w_U = np.clip(w, 0.0, self.w[-1])
+        w_interp = np.clip(w, self.w[0], self.w[-1])
+        return np.exp(self._interp((np.log(r), np.log(w_interp))))*TauTable.U(r, w_U)
+
+    # Interpolated F in terms of the tangent altitude and planet and orbit radii, vectorized over all of the inputs
+    def F(self, h_star, R_over_L, Rorb_over_R):
+        r = R_over_L + h_star
+        return self.F_rw(r, R_over_L*Rorb_over_R - r)
+
+    # Optical depth for the amplitude sigma*rho0*L (with L in km)
+    def tau(self, h_star, R_over_L, Rorb_over_R, amplitude):
+        return 2*amplitude*np.exp(-h_star)*self.F(h_star, R_over_L, Rorb_over_R)*10**5   # km to cm
+
+    # Optical depth and transmittance of an AnalyzeCrossing at an array of times. Same shapes as SAT.transmittance_curve(), including the (P x T) family of curves of a model with parameter arrays (with_params() or from_orbit_batch())
+    def transmittance_curve(self, SAT, times):
+        SAT._check_exponential("TauTable")
+        los = SAT.line_of_sight(np.asarray(times, dtype=float)[..., np.newaxis])   # same axes as the quadrature methods, for parameter arrays
+        h_star = los.tan_alt/SAT.scale_height
+        tau_array = self.tau(h_star, SAT.R/SAT.scale_height, SAT.R_orbit/SAT.R, SAT.sigma*SAT.rho0*SAT.scale_height)[..., 0]
+        transmit_array = np.exp(-tau_array)
+        return tau_array, transmit_array
+
+if __name__ == '__main__':
+    import time
+    from AnalyzeCrossing import AnalyzeCrossing
+    start_time = time.time()
+    table = TauTable.build()
+    print(f"Built the table in {time.time() - start_time:.2f} sec, max relative error = {table.max_rel_err:.2e}")
+    for cb in ["Earth", "Mars", "Venus"]:
+        SAT = AnalyzeCrossing(cb=cb, H=420)
+        time_array = np.arange(0, SAT.time_final, 1)
+        tau_table, transmit_table = table.transmittance_curve(SAT, time_array)
+        tau_gauss, transmit_gauss = SAT.transmittance_curve(time_array, N=100)
+        print(f"{cb}: max |T_table - T_gauss| = {np.max(np.abs(transmit_table - transmit_gauss)):.2e}")
+
+    # A model with parameter arrays gives the same (P x T) shape as the integrators
+    SAT = AnalyzeCrossing(cb="Earth", H=420).with_params(rho0=[0.001, 0.0012, 0.0015])
+    time_array = np.arange(0, SAT.time_final, 1)
+    tau_table, transmit_table = table.transmittance_curve(SAT, time_array)
+    tau_gauss, transmit_gauss = SAT.transmittance_curve(time_array, N=100)
+    if transmit_table.shape != transmit_gauss.shape:
+        raise RuntimeError(f"TauTable shape {transmit_table.shape} != transmittance_curve() shape {transmit_gauss.shape}")
+    print(f"rho0 array: max |T_table - T_gauss| = {np.max(np.abs(transmit_table - transmit_gauss)):.2e}")
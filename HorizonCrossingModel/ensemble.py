@@ -0,0 +1,69 @@
+# Author: Nathaniel Ruhl
+# Functions in this script run Monte Carlo ensembles of noisy horizon crossings, in order to measure the bias and scatter of the retrievals in retrieval.py
+
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+# import local libraries
+from retrieval import retrieve_rho0, retrieve_scale_height
+
+# Number of realizations drawn from each random stream. The ensemble is split into chunks of this size, each with its own seed spawned from the ensemble seed, so the result does not depend on the number of workers
+CHUNK_SIZE = 1000
+
+# Returns M noisy realizations of transmit_model as an (M x T) array. Fractional gaussian noise with standard deviation std is applied where comp_range[0] < transmit_model < comp_range[1], and the rest of the curve is left as the model
+def noisy_crossings(transmit_model, M, rng, std=0.05, comp_range=(0.01, 0.9)):
+    noise_range = (transmit_model > comp_range[0]) & (transmit_model < comp_range[1])
+    noise = rng.normal(1, std, size=(M, len(transmit_model)))
+    transmit_data = np.where(noise_range, transmit_model*noise, transmit_model)
+    return transmit_data
+
+# Draws M realizations from the random stream seed_seq and retrieves the parameter from each one. Returns an array of M estimates
+def _run_chunk(SAT, times, transmit_model, sol_range, M, seed_seq, parameter, std, comp_range, L_guess):
+    rng = np.random.default_rng(seed_seq)
+    transmit_data = noisy_crossings(transmit_model, M, rng, std, comp_range)[:, sol_range]
+    if parameter == "rho0":
+        rho0_array, rho0_err, rho0_mean, rho0_mean_err = retrieve_rho0(SAT, times[sol_range], transmit_data, std)
+        return rho0_mean
+    else:
+        time_grid = np.broadcast_to(times[sol_range], transmit_data.shape)
+        L_array, n_iter = retrieve_scale_height(SAT, time_grid, transmit_data, L_guess)
+        return np.nanmean(L_array, axis=-1)
+
+# Runs the retrieval of parameter ("rho0" or "scale_height") on M independent noisy realizations of the model crossing. The whole ensemble is reproducible from seed.
+# Chunks of CHUNK_SIZE realizations are spread over n_workers processes if n_workers > 1.
+# Returns the array of M estimates, the bias of their mean relative to the true value in SAT, and their scatter (standard deviation)
+def run_ensemble(SAT, M, seed=None, parameter="rho0", times=None, std=0.05, comp_range=(0.01, 0.9), L_guess=None, N=10, n_workers=1):
+    if parameter == "rho0":
+        true_value = SAT.rho0
+    elif parameter == "scale_height":
+        true_value = SAT.scale_height
+    else:
+        raise RuntimeError("Invalid Argument: 'parameter' must be either 'rho0' or 'scale_height'")
+    if times is None:
+        times = np.arange(0, SAT.time_final + 1, 1, dtype=float)
+    if L_guess is None:
+        L_guess = SAT.scale_height + 1
+
+    tau_model, transmit_model = SAT.transmittance_curve(times, N=N)
+    sol_range = np.where((transmit_model > comp_range[0]) & (transmit_model < comp_range[1]))[0]
+
+    chunk_sizes = [min(CHUNK_SIZE, M - start) for start in range(0, M, CHUNK_SIZE)]
+    seed_seqs = np.random.SeedSequence(seed).spawn(len(chunk_sizes))
+    tasks = [(SAT, times, transmit_model, sol_range, m, seed_seq, parameter, std, comp_range, L_guess)
+             for m, seed_seq in zip(chunk_sizes, seed_seqs)]
+    if n_workers > 1:
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            results = list(pool.map(_run_chunk, *zip(*tasks)))
+    else:
+        results = [_run_chunk(*task) for task in tasks]
+
+    estimates = np.concatenate(results)
+    bias = np.mean(estimates) - true_value
+    scatter = np.std(estimates, ddof=1)
+    return estimates, bias, scatter
+
+if __name__ == '__main__':
+    from AnalyzeCrossing import AnalyzeCrossing
+    SAT = AnalyzeCrossing(cb="Earth", H=420, E_kev=4.0)
+    estimates, bias, scatter = run_ensemble(SAT, M=10000, seed=0)
+    print(f"rho0: bias = {bias:.3e} g/cm^3, scatter = {scatter:.3e} g/cm^3 over {len(estimates)} crossings")
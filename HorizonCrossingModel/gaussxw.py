@@ -19,15 +19,52 @@
 # values of N up to 1000.  It is compatible with version 2 and version
 # 3 of Python.
 #
+# For N >= LARGE_N the points and weights come from the iteration-free
+# O(N) asymptotic formulas of Bogaert (2014) instead, see _gaussxw_large().
+# Both are cached per N.
+#
 # Written by Mark Newman <mejn@umich.edu>, June 4, 2011
 # You may use, share, or modify this file freely
 #
 ######################################################################
 
-from numpy import ones, copy, cos, tan, pi, linspace
+from collections import OrderedDict
+from numpy import ones, copy, cos, sin, tan, pi, linspace, arange, concatenate
+from scipy.special import jn_zeros, j1
+
+# Process-wide cache of the canonical [-1, 1] points and weights, keyed by
+# N. The least recently used N is evicted once GAUSSXW_CACHE_SIZE is
+# exceeded. Cached arrays are read-only since they are shared by every caller.
+GAUSSXW_CACHE_SIZE = 64
+_gaussxw_cache = OrderedDict()
+
+# For N >= LARGE_N the points are generated with _gaussxw_large()
+LARGE_N = 1000
 
 
 def gaussxw(N):
+    if N in _gaussxw_cache:
+        _gaussxw_cache.move_to_end(N)
+        return _gaussxw_cache[N]
+
+    if N >= LARGE_N:
+        x, w = _gaussxw_large(N)
+    else:
+        x, w = _gaussxw_newton(N)
+    x.setflags(write=False)
+    w.setflags(write=False)
+
+    _gaussxw_cache[N] = (x, w)
+    if len(_gaussxw_cache) > GAUSSXW_CACHE_SIZE:
+        _gaussxw_cache.popitem(last=False)
+    return x, w
+
+
+def gaussxw_clear_cache():
+    _gaussxw_cache.clear()
+
+
+def _gaussxw_newton(N):
 
     # Initial approximation to roots of the Legendre polynomial
     a = linspace(3, 4*N-1, N)/(4*N+2)
@@ -52,6 +89,71 @@ def gaussxw(N):
     return x, w
 
 
+# Large-N generator, O(N) with no recurrence or iteration. The nodes
+# and weights are the explicit asymptotic expansions of I. Bogaert,
+# "Iteration-free computation of Gauss-Legendre quadrature nodes and
+# weights", SIAM J. Sci. Comput. 36 (2014), A1008-A1026, in powers of
+# 1/(N+1/2) around the zeros of the Bessel function J0. They are accurate to
+# double precision for N > 100 (the weights near x = +/-1 more so than the
+# Newton iterations above, which lose digits in 1-x^2). Only the
+# non-negative half of the roots is computed and the rest follow from the
+# symmetry of P_N.
+def _gaussxw_large(N):
+    M = (N+1)//2
+    nu = _besselj0_zeros(M)
+    B = _besselj1_squared(nu)
+    v = 1/(N+0.5)
+    theta = v*nu
+    t = theta*theta
+
+    # Chebyshev interpolants of the coefficients of the node expansion...
+    SF1 = (((((-1.29052996274280508473467968379e-12*t +2.40724685864330121825976175184e-10)*t -3.13148654635992041468855740012e-8)*t +0.275573168962061235623801563453e-5)*t -0.148809523713909147898955880165e-3)*t +0.416666666665193394525296923981e-2)*t -0.416666666666662959639712457549e-1
+    SF2 = (((((+2.20639421781871003734786884322e-9*t -7.53036771373769326811030753538e-8)*t +0.161969259453836261731700382098e-5)*t -0.253300326008232025914059965302e-4)*t +0.282116886057560434805998583817e-3)*t -0.209022248387852902722635654229e-2)*t +0.815972221772932265640401128517e-2
+    SF3 = (((((-2.97058225375526229899781956673e-8*t +5.55845330223796209655886325712e-7)*t -0.567797841356833081642185432056e-5)*t +0.418498100329504574443885193835e-4)*t -0.251395293283965914823026348764e-3)*t +0.128654198542845137196151147483e-2)*t -0.416012165620204364833694266818e-2
+    # ...and of the weight expansion
+    WSF1 = ((((((((-2.20902861044616638398573427475e-14*t +2.30365726860377376873232578871e-12)*t -1.75257700735423807659851042318e-10)*t +1.03756066927916795821098009353e-8)*t -4.63968647553221331251529631098e-7)*t +0.149644593625028648361395938176e-4)*t -0.326278659594412170300449074873e-3)*t +0.436507936507598105249726413120e-2)*t -0.305555555555553028279487898503e-1)*t +0.833333333333333302184063103900e-1
+    WSF2 = (((((((+3.63117412152654783455929483029e-12*t +7.67643545069893130779501844323e-11)*t -7.12912857233642220650643150625e-9)*t +2.11483880685947151466370130277e-7)*t -0.381817918680045468483009307090e-5)*t +0.465969530694968391417927388162e-4)*t -0.407297185611335764191683161117e-3)*t +0.268959435694729660779984493795e-2)*t -0.111111111111214923138249347172e-1
+    WSF3 = (((((((+2.01826791256703301806643264922e-9*t -4.38647122520206649251063212545e-8)*t +5.08898347288671653137451093208e-7)*t -0.397933316519135275712977531366e-5)*t +0.200559326396458326778521795392e-4)*t -0.422888059282921161626339411388e-4)*t -0.105646050254076140548678457002e-3)*t -0.947969308958577323145923317955e-4)*t +0.656966489926484797412985260842e-2
+
+    nu_over_sin = nu/sin(theta)
+    B_nu_over_sin = B*nu_over_sin
+    W = v*v*nu_over_sin
+    W2 = W*W
+    theta = v*(nu + theta*W*(SF1 + W2*(SF2 + W2*SF3)))
+    x = cos(theta)
+    w = 2*v/(B_nu_over_sin + B_nu_over_sin*W2*(WSF1 + W2*(WSF2 + W2*WSF3)))
+    if N % 2 == 1:
+        x[-1] = 0.0   # the middle root of an odd Legendre polynomial
+
+    # Mirror the positive roots, keeping the descending order of gaussxw
+    return concatenate((x, -x[:N//2][::-1])), concatenate((w, w[:N//2][::-1]))
+
+
+# First M zeros of J0. The first 20 are computed by scipy, the rest from
+# McMahon's asymptotic expansion, which is exact to double precision there
+def _besselj0_zeros(M):
+    k = arange(1, M+1)
+    z = pi*(k-0.25)
+    r = 1/z
+    r2 = r*r
+    z = z + r*(0.125+r2*(-0.807291666666666666666666666667e-1+r2*(0.246638302951388888888888888889+r2*(-1.82424932021218532986111111111+r2*(25.3330140858001160318468867188+r2*(-567.644412135183381139802038240+r2*(18690.4765282320653831636345064+r2*(-8.49353580299148769921876983660e5+r2*5.09225462402226769498681286758e7))))))))
+    n = min(M, 20)
+    z[:n] = jn_zeros(0, n)
+    return z
+
+
+# J1(nu)^2 at the zeros nu of J0, from scipy for the first 21 and an
+# asymptotic expansion in 1/(k-1/4) after that
+def _besselj1_squared(nu):
+    k = arange(1, len(nu)+1)
+    r = 1/(k-0.25)
+    r2 = r*r
+    B = r*(0.202642367284675542887092775228 + r2*r2*(-0.303380429711290253026202643516e-3 + r2*(0.198924364245969295201137972743e-3 + r2*(-0.228969902772111653038747229723e-3+r2*(0.433710719130746277915572905025e-3+r2*(-0.123632349727175414724737657367e-2+r2*(0.496101423268883102872271417616e-2+r2*(-0.266837393702323757700998557826e-1+r2*.185395398206345628711318848386))))))))
+    n = min(len(nu), 21)
+    B[:n] = j1(nu[:n])**2
+    return B
+
+
 def gaussxwab(N, a, b):
     x, w = gaussxw(N)
     return 0.5*(b-a)*x+0.5*(b+a), 0.5*(b-a)*w
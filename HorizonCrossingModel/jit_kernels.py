@@ -0,0 +1,78 @@
+# Author: Nathaniel Ruhl
+# Functions in this script are compiled kernels for the gaussian quadrature of the line of sight, used by AnalyzeCrossing when backend="jit". Each kernel fuses the geometry (tangent altitude and half chord), the exponential density, and the quadrature sum into one loop, so no temporary arrays are made.
+# numba is optional. Without it, HAVE_NUMBA is False, AnalyzeCrossing falls back to the numpy backend, and the kernels below still run as (slow) pure python, which is only useful to check them against the numpy backend.
+
+import numpy as np
+
+try:
+    from numba import njit
+    HAVE_NUMBA = True
+except ImportError:
+    HAVE_NUMBA = False
+
+    def njit(*args, **kwargs):
+        return lambda func: func
+
+# Optical depth at each time in t_array (1d), with the canonical gaussian points x and weights w on [-1, 1]. Same as AnalyzeCrossing.tau_gauss() for scalar parameters
+@njit(cache=True)
+def tau_gauss_kernel(t_array, x, w, R, R_orbit, theta, omega, rho0, scale_height, sigma):
+    tau_array = np.empty(t_array.shape[0])
+    for i in range(t_array.shape[0]):
+        h = R_orbit*np.sin(theta+omega*t_array[i]) - R
+        r2 = (R+h)**2
+        b = np.sqrt(R_orbit**2 - r2)   # half chord
+        tau = 0.0
+        for k in range(x.shape[0]):
+            x_km = 0.5*b*x[k] + 0.5*b
+            z = np.sqrt(r2 + (b - x_km)**2) - R
+            tau += 0.5*b*w[k]*(sigma*(rho0*np.exp(-z/scale_height))*10**5)
+        tau_array[i] = 2*tau
+    return tau_array
+
+# Exponential integral and its derivative with respect to scale height at each time in t_array, with one scale height per time in L_array (1d arrays of the same length). Same as AnalyzeCrossing.exp_integral(t, L, return_dL=True)
+@njit(cache=True)
+def exp_integral_kernel(t_array, L_array, x, w, R, R_orbit, theta, omega):
+    exp_int = np.empty(t_array.shape[0])
+    dexp_int = np.empty(t_array.shape[0])
+    for i in range(t_array.shape[0]):
+        h = R_orbit*np.sin(theta+omega*t_array[i]) - R
+        r2 = (R+h)**2
+        b = np.sqrt(R_orbit**2 - r2)   # half chord
+        L = L_array[i]
+        total = 0.0
+        dtotal = 0.0
+        for k in range(x.shape[0]):
+            x_km = 0.5*b*x[k] + 0.5*b
+            z = np.sqrt(r2 + (b - x_km)**2) - R
+            integrand = np.exp(-z/L)
+            total += 0.5*b*w[k]*integrand
+            dtotal += 0.5*b*w[k]*integrand*z/L**2
+        exp_int[i] = total*10**5   # convert to cm
+        dexp_int[i] = dtotal*10**5
+    return exp_int, dexp_int
+
+if __name__ == '__main__':
+    import time
+    from AnalyzeCrossing import AnalyzeCrossing
+    # Check that the jit backend agrees with the numpy backend, which is the reference
+    for cb in ["Earth", "Mars", "Venus"]:
+        SAT_numpy = AnalyzeCrossing(cb=cb, H=420, backend="numpy")
+        SAT_jit = AnalyzeCrossing(cb=cb, H=420, backend="jit")
+        time_array = np.arange(0, SAT_numpy.time_final, 0.25)
+        L_array = np.linspace(0.5, 2, len(time_array))*SAT_numpy.scale_height
+        for N in [10, 50]:
+            np.testing.assert_allclose(SAT_jit.tau_gauss(time_array, N), SAT_numpy.tau_gauss(time_array, N), rtol=1e-13, atol=0)
+        for L in [None, L_array]:
+            for result_jit, result_numpy in zip(SAT_jit.exp_integral(time_array, L, return_dL=True), SAT_numpy.exp_integral(time_array, L, return_dL=True)):
+                np.testing.assert_allclose(result_jit, result_numpy, rtol=1e-13, atol=0)
+        print(f"{cb}: jit and numpy backends agree (numba available: {HAVE_NUMBA})")
+
+    SAT_numpy = AnalyzeCrossing(cb="Earth", H=420, backend="numpy")
+    SAT_jit = AnalyzeCrossing(cb="Earth", H=420, backend="jit")
+    time_array = np.arange(0, SAT_numpy.time_final+1, 1)
+    for SAT in [SAT_numpy, SAT_jit]:
+        SAT.tau_gauss(time_array, 10)   # compiles the kernel
+        start_time = time.perf_counter()
+        for i in range(1000):
+            SAT.tau_gauss(time_array, 10)
+        print(f"backend = {SAT.backend}: {(time.perf_counter() - start_time):.3f} sec for 1000 transmittance curves")
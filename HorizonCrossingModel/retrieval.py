@@ -0,0 +1,111 @@
+# Author: Nathaniel Ruhl
+# Functions in this script retrieve atmospheric parameters from the transmittance data of a horizon crossing. Each retrieval works on all of the data points at once rather than one point at a time
+
+import numpy as np
+import warnings
+
+# Solves ln(T) + 2*sigma*rho0*I(t) = 0 for rho0 at every data point, where I(t) is SAT.exp_integral(t). The equation is linear in rho0, so each point has the closed form rho0 = -ln(T)/(2*sigma*I(t)), and the exponential integral is evaluated for all of the times in one call.
+# std is the fractional noise on the transmittance (a single value or one per point), which is the uncertainty of ln(T).
+# transmit_data can have leading axes for several crossings sampled at the same times, in which case the mean is taken along the last axis for each crossing.
+# Returns the rho0 of each point and its uncertainty, and the inverse-variance weighted mean and its uncertainty
+def retrieve_rho0(SAT, times, transmit_data, std=0.05):
+    exp_int = SAT.exp_integral(times)
+    rho0_array = -np.log(transmit_data)/(2*SAT.sigma*exp_int)
+    rho0_err = np.broadcast_to(std/(2*SAT.sigma*exp_int), rho0_array.shape)
+    weights = 1/rho0_err**2
+    rho0_mean = np.sum(weights*rho0_array, axis=-1)/np.sum(weights, axis=-1)
+    rho0_mean_err = 1/np.sqrt(np.sum(weights, axis=-1))
+    return rho0_array, rho0_err, rho0_mean, rho0_mean_err
+
+# Solves ln(T) + 2*sigma*rho0*I(t, L) = 0 for the scale height L at every data point with Newton's method, where I(t, L) is SAT.exp_integral(t, L). All of the points are iterated together using the exact derivative dI/dL from the same quadrature nodes, and each point is dropped from the iteration once its Newton step is below accuracy (km). times and transmit_data can have any (matching) shape.
+# Returns the L of each point (nan where transmit_data >= 1, which has no solution) and the number of iterations it took (max_iter if it did not converge, 0 where transmit_data >= 1)
+def retrieve_scale_height(SAT, times, transmit_data, L_guess, accuracy=1e-4, max_iter=50):
+    times = np.asarray(times, dtype=float)
+    log_transmit = np.log(transmit_data)
+    L_array = np.full(times.shape, L_guess, dtype=float)
+    n_iter = np.zeros(times.shape, dtype=int)
+    # There is no solution if noise pushed the transmittance to 1 or above
+    L_array[log_transmit >= 0] = np.nan
+    active = np.flatnonzero(log_transmit < 0)   # indices of the points still iterating
+    for i in range(max_iter):
+        if len(active) == 0:
+            break
+        exp_int, dexp_int = SAT.exp_integral(times.flat[active], scale_height=L_array.flat[active], return_dL=True)
+        f = log_transmit.flat[active] + 2*SAT.sigma*SAT.rho0*exp_int
+        df = 2*SAT.sigma*SAT.rho0*dexp_int
+        with np.errstate(divide="ignore"):
+            delta = f/df
+        # Keep each step within a factor of 2 of the current L, so L stays positive
+        L_active = L_array.flat[active]
+        L_array.flat[active] -= np.clip(delta, -L_active, L_active/2)
+        n_iter.flat[active] += 1
+        active = active[~(np.abs(delta) <= accuracy)]   # a nan step is not converged
+    return L_array, n_iter
+
+# Parameters that fit_crossing() can fit, in the order they are reported
+FIT_PARAMS = ("rho0", "scale_height", "sigma")
+
+# Fits the parameters named in free to the whole transmittance curve at once with the Levenberg-Marquardt method. The residuals are (ln(T) + tau)/std, since the noise on T is fractional, and tau = 2*sigma*rho0*I(t, L) is evaluated for all of the times in one call with analytic derivatives for the Jacobian.
+# The fit is done in the logarithms of the parameters, which are all positive. rho0 and L differ by orders of magnitude, and ln(tau) is linear in ln(rho0), so the valley of chi^2 is much better scaled in the logarithms. accuracy is the largest relative step at convergence
+# sigma and rho0 only appear as their product, so at most one of them can be free. Parameters that are not free (and the starting point if p0 is None) are taken from SAT, which is not modified.
+# Returns the best fit values in the order of free, their covariance matrix, the number of model evaluations, and whether the fit converged within max_iter iterations (a RuntimeWarning is also issued if it did not)
+def fit_crossing(SAT, times, transmit, free=("rho0", "scale_height"), p0=None, std=0.05, accuracy=1e-8, max_iter=100):
+    for name in free:
+        if name not in FIT_PARAMS:
+            raise RuntimeError(f"Invalid Argument: free parameters must be in {FIT_PARAMS}")
+    if "rho0" in free and "sigma" in free:
+        raise RuntimeError("rho0 and sigma only appear as sigma*rho0 in the optical depth, so they cannot both be free")
+
+    times = np.asarray(times, dtype=float)
+    log_transmit = np.log(transmit)
+    std = np.broadcast_to(std, times.shape)
+    p_fixed = {"rho0": SAT.rho0, "scale_height": SAT.scale_height, "sigma": SAT.sigma}
+    if p0 is None:
+        p0 = [p_fixed[name] for name in free]
+    log_p = np.log(np.asarray(p0, dtype=float))
+
+    # Weighted residuals and their Jacobian with respect to the logarithms of the free parameters. The scale height derivative is only needed (and only defined for the exponential atmosphere) if the scale height is free
+    def model(log_p):
+        params = {"rho0": p_fixed["rho0"], "scale_height": p_fixed["scale_height"], "sigma": p_fixed["sigma"]}
+        params.update(zip(free, np.exp(log_p)))
+        if "scale_height" in free:
+            exp_int, dexp_int = SAT.exp_integral(times, scale_height=params["scale_height"], return_dL=True)
+        else:
+            exp_int, dexp_int = SAT.exp_integral(times), None
+        tau = 2*params["sigma"]*params["rho0"]*exp_int
+        # d(tau)/d(ln p) = p*d(tau)/dp
+        dtau = {"rho0": tau,
+                "scale_height": None if dexp_int is None else 2*params["sigma"]*params["rho0"]*dexp_int*params["scale_height"],
+                "sigma": tau}
+        residual = (log_transmit + tau)/std
+        jacobian = np.stack([dtau[name] for name in free], axis=-1)/std[:, np.newaxis]
+        return residual, jacobian
+
+    residual, jacobian = model(log_p)
+    chisq = np.sum(residual**2)
+    n_eval = 1
+    lam = 1e-3   # damping parameter
+    converged = False
+    for i in range(max_iter):
+        alpha = jacobian.T @ jacobian
+        step = np.linalg.solve(alpha + lam*np.diag(np.diag(alpha)), -jacobian.T @ residual)
+        # A step that is too large can overflow, its chi^2 is then nan and the step is rejected
+        with np.errstate(over="ignore", invalid="ignore"):
+            trial_residual, trial_jacobian = model(log_p + step)
+        n_eval += 1
+        trial_chisq = np.sum(trial_residual**2)
+        if trial_chisq <= chisq:
+            converged = bool(np.all(np.abs(step) <= accuracy))
+            log_p, residual, jacobian, chisq = log_p + step, trial_residual, trial_jacobian, trial_chisq
+            lam /= 10
+            if converged:
+                break
+        else:
+            lam *= 10
+    if not converged:
+        warnings.warn(f"fit_crossing() did not converge in {max_iter} iterations", RuntimeWarning)
+
+    p_fit = np.exp(log_p)
+    # Covariance of the parameters from the covariance of their logarithms
+    covariance = np.linalg.inv(jacobian.T @ jacobian)*np.outer(p_fit, p_fit)
+    return p_fit, covariance, n_eval, converged
@@ -4,77 +4,138 @@
 import numpy as np
 
 # Valid energy range is 0.03 keV to 10 keV
+VALID_RANGE_KEV = (0.03, 10.0)
+
+# Absorption edges (eV) at which each fit switches branch
+EDGE_EV = {"N": 401.0, "O": 531.7, "Ar": 3202.9, "C": 284.0}
+
+ELEMENTS = ("N", "O", "Ar", "C")   # same order as the mix arguments of get_total_xsect()
+
 # Cross Sections are for elemental Oxygen, Nitrogen, and Argon
 # I put these functions in this class mainly for namespacing purposes
 class BCM:
     def __init__(self):
         return
 
-    # This function can either takes the energy as an array of values or just a single value. Each of the other functions only take in single values for energy at a time
+    # This function takes the energy as either a single value or an array of any shape. Each of the element functions below is vectorized, with the absorption edges applied by np.where
     @staticmethod
     def get_total_xsect(mean_energy_kev, mix_N, mix_O, mix_Ar, mix_C):
-        energy_ev = mean_energy_kev * 1000
-        if isinstance(energy_ev, np.ndarray):
-            O_xsect = np.array(list(map(BCM.oxygen_xsect, energy_ev)))
-            N_xsect = np.array(list(map(BCM.nitrogen_xsect, energy_ev)))
-            Ar_xsect = np.array(list(map(BCM.argon_xsect, energy_ev)))
-            C_xsect = np.array(list(map(BCM.carbon_xsect, energy_ev)))
-            xsect_total = mix_O * O_xsect + mix_N * N_xsect + mix_Ar * Ar_xsect + mix_C * C_xsect
-        else:
-            xsect_total = mix_O * BCM.oxygen_xsect(energy_ev) + mix_N * BCM.nitrogen_xsect(energy_ev) \
-                + mix_Ar * BCM.argon_xsect(energy_ev) + mix_C * BCM.carbon_xsect(energy_ev)
-        return xsect_total
+        energy_ev = np.asarray(mean_energy_kev, dtype=float) * 1000
+        xsect_total = mix_O * BCM.oxygen_xsect(energy_ev) + mix_N * BCM.nitrogen_xsect(energy_ev) \
+            + mix_Ar * BCM.argon_xsect(energy_ev) + mix_C * BCM.carbon_xsect(energy_ev)
+        return BCM._as_input(xsect_total, mean_energy_kev)
+
+    # Cross sections (cm^2/g) of N, O, Ar, and C (the order of ELEMENTS) at an energy or array of energies in keV, stacked along a new first axis
+    @staticmethod
+    def element_xsects(mean_energy_kev):
+        energy_ev = np.asarray(mean_energy_kev, dtype=float) * 1000
+        return np.array([BCM.nitrogen_xsect(energy_ev), BCM.oxygen_xsect(energy_ev), BCM.argon_xsect(energy_ev), BCM.carbon_xsect(energy_ev)])
+
+    # Returns a single float if the energy (and mix) was given as a single number, otherwise the array
+    @staticmethod
+    def _as_input(xsect, energy):
+        if np.ndim(energy) == 0 and np.ndim(xsect) == 0:
+            return float(xsect)
+        return xsect
+
+    # Each fit is a polynomial in ln(E) on either side of an absorption edge. The *_fit functions return X = ln(sigma*E^3) for both branches, and np.where picks one per energy, so energy_ev can be an array of any shape
+    @staticmethod
+    def _edge_xsect(energy_ev, fit, edge_ev):
+        energy_ev = np.asarray(energy_ev, dtype=float)
+        X_below, X_above = fit(np.log(energy_ev))
+        X = np.where(energy_ev < edge_ev, X_below, X_above)
+        xsect = np.exp(X)/(energy_ev**3)
+        return BCM._as_input(xsect, energy_ev)
+
+    @staticmethod
+    def oxygen_fit(Elog):
+        X_below = 2.57264 + (10.9321 * Elog) + \
+            (-1.79383*Elog**2) + (0.102619*Elog**3)
+        X_above = 16.53869 + (0.6428144 + 3.)*Elog - 0.3177744 * \
+            Elog**2 + 7.9471897e-3 * (Elog ** 3)
+        return X_below, X_above
 
     @staticmethod
     def oxygen_xsect(energy_ev):
-        Elog = np.log(energy_ev)
-        if energy_ev < 531.7:
-            X = 2.57264 + (10.9321 * Elog) + \
-                (-1.79383*Elog**2) + (0.102619*Elog**3)
-        else:
-            X = 16.53869 + (0.6428144 + 3.)*Elog - 0.3177744 * \
-                Elog**2 + 7.9471897e-3 * (Elog ** 3)
-        oxygen_xsect = np.exp(X)/(energy_ev**3)
-        return oxygen_xsect
+        return BCM._edge_xsect(energy_ev, BCM.oxygen_fit, EDGE_EV["O"])
+
+    @staticmethod
+    def nitrogen_fit(Elog):
+        X_below = 9.24058 + (7.02985 * Elog) + (-1.08849 * Elog *
+                                                Elog) + (0.0611007 * Elog * Elog * Elog)
+        X_above = -13.0353 + (15.4851 * Elog) + (-1.89502 *
+                                                 Elog**2) + (0.0769412*Elog**3)
+        return X_below, X_above
 
     @staticmethod
     def nitrogen_xsect(energy_ev):
-        Elog = np.log(energy_ev)
-        if energy_ev < 401.0:
-            X = 9.24058 + (7.02985 * Elog) + (-1.08849 * Elog *
-                                              Elog) + (0.0611007 * Elog * Elog * Elog)
-        else:
-            X = -13.0353 + (15.4851 * Elog) + (-1.89502 *
-                                               Elog**2) + (0.0769412*Elog**3)
-        nitrogen_xsect = np.exp(X)/(energy_ev**3)
-        return nitrogen_xsect
+        return BCM._edge_xsect(energy_ev, BCM.nitrogen_fit, EDGE_EV["N"])
+
+    # The BCM fit has a third argon segment between the L and K edges, but it was behind a duplicate "< 3202.9" condition and never reached, so only the two branches that were in use are kept
+    @staticmethod
+    def argon_fit(Elog):
+        X_below = -330.3509 + (267.7433 + 3.) * Elog - 78.90498 * Elog**2 \
+            + 10.35983 * (Elog ** 3) - 0.5140201 * (Elog ** 4)
+        X_above = 19.1905 + (2.74276 * Elog) + (-0.164603 *
+                                                Elog * Elog) + (0.00165895*Elog**3)
+        return X_below, X_above
 
     @staticmethod
     def argon_xsect(energy_ev):
-        Elog = np.log(energy_ev)
-        if energy_ev < 3202.9:
-            X = -330.3509 + (267.7433 + 3.) * Elog - 78.90498 * Elog**2 \
-                + 10.35983 * (Elog ** 3) - 0.5140201 * (Elog ** 4)
-        elif energy_ev < 3202.9:
-            X = -5.71870 + (8.85812 * Elog) + (-0.307357 * Elog * Elog) \
-                + (0.00169351 * (Elog ** 3)) + (-0.0138134 * (Elog ** 4)) \
-                + (0.00120451 * (Elog ** 5))
-        else:
-            X = 19.1905 + (2.74276 * Elog) + (-0.164603 *
-                                              Elog * Elog) + (0.00165895*Elog**3)
-        argon_xsect = np.exp(X)/(energy_ev**3)
-        return argon_xsect
+        return BCM._edge_xsect(energy_ev, BCM.argon_fit, EDGE_EV["Ar"])
+
+    @staticmethod
+    def carbon_fit(Elog):
+        X_below = 8.74161 + (7.13348*Elog) + (-1.14604*Elog*Elog) + (0.0677044*Elog*Elog*Elog)
+        X_above = 3.81334 + (8.93626*Elog) + (-1.06905*Elog*Elog) + (0.0422195*Elog*Elog*Elog)
+        return X_below, X_above
 
     @staticmethod
     def carbon_xsect(energy_ev):
-        Elog = np.log(energy_ev)
-        if energy_ev < 284.0:
-            X = 8.74161 + (7.13348*Elog) + (-1.14604*Elog*Elog) + (0.0677044*Elog*Elog*Elog)
-        else:
-            X = 3.81334 + (8.93626*Elog) + (-1.06905*Elog*Elog) + (0.0422195*Elog*Elog*Elog)
-
-        carbon_xsect = np.exp(X)/(energy_ev**3)
-        return carbon_xsect
+        return BCM._edge_xsect(energy_ev, BCM.carbon_fit, EDGE_EV["C"])
+
+
+# Precomputed log-log table of the BCM element cross sections over the valid energy range.
+# Both branches of every fit are tabulated across the whole range, so linear interpolation never straddles an absorption edge, and the branch is picked per energy exactly as in BCM.
+# The grid is uniform in ln(E), so a lookup is O(1) per energy. Energies outside VALID_RANGE_KEV return nan.
+class XsectTable:
+    ELEMENTS = ELEMENTS
+    FITS = (BCM.nitrogen_fit, BCM.oxygen_fit, BCM.argon_fit, BCM.carbon_fit)
+
+    def __init__(self, n_points=4096):
+        self.n_points = n_points
+        self.log_e_min = np.log(VALID_RANGE_KEV[0]*1000)
+        self.log_e_max = np.log(VALID_RANGE_KEV[1]*1000)
+        self.dlog = (self.log_e_max - self.log_e_min)/(n_points - 1)
+        self.edges_ev = np.array([EDGE_EV[element] for element in XsectTable.ELEMENTS])
+        log_e_grid = np.linspace(self.log_e_min, self.log_e_max, n_points)
+        # Table of X = ln(sigma*E^3) with shape (element, branch, n_points), where branch 0 is below the edge and 1 is above
+        self._X_table = np.array([fit(log_e_grid) for fit in XsectTable.FITS])
+
+        # Measure the interpolation error at the cell midpoints, where it is largest
+        energy_mid_ev = np.exp(log_e_grid[:-1] + self.dlog/2)
+        exact = np.array([BCM._edge_xsect(energy_mid_ev, fit, edge)
+                          for fit, edge in zip(XsectTable.FITS, self.edges_ev)])
+        self.max_rel_err = np.max(np.abs(self.element_xsects(energy_mid_ev/1000)/exact - 1))
+
+    # Cross sections (cm^2/g) of N, O, Ar, and C at an energy or array of energies in keV, stacked along a new first axis
+    def element_xsects(self, energy_kev):
+        energy_ev = np.asarray(energy_kev, dtype=float)*1000
+        log_e = np.log(energy_ev)
+        u = (log_e - self.log_e_min)/self.dlog
+        i = np.clip(np.floor(u).astype(int), 0, self.n_points - 2)
+        frac = u - i
+        X_interp = (1 - frac)*self._X_table[:, :, i] + frac*self._X_table[:, :, i+1]
+        edges_ev = self.edges_ev.reshape((-1,) + (1,)*energy_ev.ndim)
+        X = np.where(energy_ev < edges_ev, X_interp[:, 0], X_interp[:, 1])
+        xsects = np.exp(X - 3*log_e)
+        return np.where((log_e >= self.log_e_min) & (log_e <= self.log_e_max), xsects, np.nan)
+
+    # Same call signature as BCM.get_total_xsect()
+    def get_total_xsect(self, mean_energy_kev, mix_N, mix_O, mix_Ar, mix_C):
+        xsects = self.element_xsects(mean_energy_kev)
+        xsect_total = mix_N*xsects[0] + mix_O*xsects[1] + mix_Ar*xsects[2] + mix_C*xsects[3]
+        return BCM._as_input(xsect_total, mean_energy_kev)
 
 def main():
     import matplotlib.pyplot as plt